@@ -3,100 +3,185 @@ Memory Cache Engine - Sushupti (Deep Sleep State)
 Handles fast in-memory caching and operations
 """
 
-from typing import Dict, List, Any, Optional, Tuple
-from collections import OrderedDict
+from typing import Dict, List, Any, Callable, Hashable, Optional, Tuple, Set, Iterable
+from collections import OrderedDict, defaultdict, deque
+from itertools import compress, repeat
+from operator import itemgetter, not_
 import time
 from .exceptions import StorageError
+from .storage import COMPARE_OPS, scan_column
 
-class CacheEntry:
-    """Represents a cached query result"""
-    
-    def __init__(self, data: Any, ttl: int = 300):  # 5 minute default TTL
-        self.data = data
-        self.created_at = time.time()
-        self.ttl = ttl
-        self.access_count = 0
-    
-    def is_expired(self) -> bool:
-        """Check if cache entry has expired"""
-        return time.time() - self.created_at > self.ttl
-    
-    def access(self):
-        """Record access to this cache entry"""
-        self.access_count += 1
+class FrequencySketch:
+    """Approximate access counts for cache admission (TinyLFU)
+    
+    A count-min sketch of four rows of saturating 4-bit counters (one byte
+    each here). Counters are halved after every 10 x capacity increments so
+    old popularity fades.
+    """
+    
+    def __init__(self, capacity: int):
+        width = 16
+        while width < capacity:
+            width <<= 1
+        self._mask = width - 1
+        self._offsets = (0, width, 2 * width, 3 * width)
+        self._table = bytearray(4 * width)
+        self._sample_size = 10 * max(capacity, 1)
+        self._additions = 0
+    
+    def _slots(self, key: Any):
+        h = hash(key)
+        mask = self._mask
+        a, b, c, d = self._offsets
+        return (a + (h & mask), b + ((h >> 16) & mask),
+                c + ((h >> 32) & mask), d + (((h >> 48) ^ h) & mask))
+    
+    def increment(self, key: Any):
+        """Record one access to key"""
+        table = self._table
+        for i in self._slots(key):
+            if table[i] < 15:
+                table[i] += 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._table = bytearray(c >> 1 for c in table)
+            self._additions //= 2
+    
+    def frequency(self, key: Any) -> int:
+        """Estimated recent access count for key"""
+        table = self._table
+        return min(table[i] for i in self._slots(key))
 
 class LRUCache:
-    """Least Recently Used cache implementation"""
+    """Least Recently Used cache implementation
     
-    def __init__(self, max_size: int = 1000):
+    Every entry shares the cache-level TTL, so deadlines are issued in
+    insertion order; a FIFO of (deadline, key) lets cleanup stop at the
+    first live deadline instead of scanning the whole cache. put() trims
+    stale records from its head and rebuilds it past 2 x max_size, so it
+    stays bounded. Entries are stored as (value, expires_at_ns) tuples.
+    
+    With admission enabled, a full cache only takes a new key if it has
+    been requested at least as often as the entry it would evict.
+    
+    on_evict, if given, is called with each key the cache drops on its own
+    (LRU eviction or expiry), but not for keys removed by invalidate().
+    """
+    
+    def __init__(self, max_size: int = 1000, ttl: int = 300,  # 5 minute default TTL
+                 admission: bool = False,
+                 on_evict: Optional[Callable[[Hashable], None]] = None):
         self.max_size = max_size
+        self.ttl_ns = ttl * 1_000_000_000
         self.cache = OrderedDict()
+        self._expiry = deque()
+        self.sketch = FrequencySketch(max_size) if admission else None
+        self.on_evict = on_evict
     
-    def get(self, key: str) -> Optional[Any]:
+    def __contains__(self, key: Hashable) -> bool:
+        """True if key has an entry, live or not yet cleaned up"""
+        return key in self.cache
+    
+    def get(self, key: Hashable) -> Optional[Any]:
         """Get item from cache"""
-        if key not in self.cache:
+        if self.sketch is not None:
+            self.sketch.increment(key)
+        entry = self.cache.get(key)
+        if entry is None:
             return None
         
-        entry = self.cache[key]
-        
         # Check if expired
-        if entry.is_expired():
+        value, expires_at_ns = entry
+        if time.monotonic_ns() > expires_at_ns:
             del self.cache[key]
+            if self.on_evict is not None:
+                self.on_evict(key)
             return None
         
         # Move to end (most recently used)
         self.cache.move_to_end(key)
-        entry.access()
         
-        return entry.data
+        return value
     
-    def put(self, key: str, value: Any, ttl: int = 300):
+    def put(self, key: Hashable, value: Any):
         """Put item in cache"""
+        expires_at_ns = time.monotonic_ns() + self.ttl_ns
         if key in self.cache:
             # Update existing entry
-            self.cache[key] = CacheEntry(value, ttl)
+            self.cache[key] = (value, expires_at_ns)
             self.cache.move_to_end(key)
         else:
             # Add new entry
             if len(self.cache) >= self.max_size:
+                sketch = self.sketch
+                if sketch is not None and self.cache:
+                    victim = next(iter(self.cache))
+                    if sketch.frequency(key) < sketch.frequency(victim):
+                        return  # Colder than what it would evict
                 # Remove least recently used
-                self.cache.popitem(last=False)
+                evicted, _ = self.cache.popitem(last=False)
+                if self.on_evict is not None:
+                    self.on_evict(evicted)
             
-            self.cache[key] = CacheEntry(value, ttl)
+            self.cache[key] = (value, expires_at_ns)
+        
+        expiry = self._expiry
+        expiry.append((expires_at_ns, key))
+        # Drop head records whose key has since been replaced, evicted or invalidated
+        cache = self.cache
+        while expiry:
+            deadline, head_key = expiry[0]
+            entry = cache.get(head_key)
+            if entry is not None and entry[1] == deadline:
+                break
+            expiry.popleft()
+        if len(expiry) > 2 * self.max_size:
+            # Stale records are stuck behind a live head; keep only live deadlines
+            self._expiry = deque(sorted(((entry[1], k) for k, entry in cache.items()),
+                                        key=itemgetter(0)))
     
-    def invalidate(self, pattern: str = None):
+    def invalidate(self, keys: Optional[Iterable[Hashable]] = None):
         """Invalidate cache entries"""
-        if pattern is None:
+        if keys is None:
             # Clear all
             self.cache.clear()
+            self._expiry.clear()
         else:
-            # Remove entries matching pattern
-            keys_to_remove = [k for k in self.cache.keys() if pattern in k]
-            for key in keys_to_remove:
-                del self.cache[key]
+            # Remove the given entries
+            for key in keys:
+                self.cache.pop(key, None)
     
     def cleanup_expired(self):
         """Remove all expired entries"""
-        expired_keys = [
-            key for key, entry in self.cache.items()
-            if entry.is_expired()
-        ]
-        for key in expired_keys:
-            del self.cache[key]
+        now_ns = time.monotonic_ns()
+        expiry = self._expiry
+        while expiry and expiry[0][0] < now_ns:
+            expires_at_ns, key = expiry.popleft()
+            entry = self.cache.get(key)
+            # Skip records for keys since replaced, evicted or invalidated
+            if entry is not None and entry[1] == expires_at_ns:
+                del self.cache[key]
+                if self.on_evict is not None:
+                    self.on_evict(key)
 
 class MemoryCache:
     """Memory cache engine implementing the Sushupti (Deep Sleep) principle"""
     
     def __init__(self, max_size: int = 1000):
-        self.query_cache = LRUCache(max_size)
-        self.table_cache = LRUCache(max_size // 10)  # Smaller cache for table metadata
+        # Skewed query mixes: keep one-off queries from evicting hot ones
+        self.query_cache = LRUCache(max_size, admission=True, on_evict=self._forget_query)
+        self.table_cache = LRUCache(max_size // 10, ttl=3600)  # Smaller, longer-lived cache for table metadata
+        # Table name -> keys of cached queries reading it, for targeted invalidation,
+        # and the reverse, so keys the cache drops leave the index too
+        self.table_to_queries: Dict[str, Set[Hashable]] = defaultdict(set)
+        self._query_tables: Dict[Hashable, Tuple[str, ...]] = {}
         self.stats = {
             'hits': 0,
             'misses': 0,
             'evictions': 0
         }
     
-    def get_query_result(self, query_hash: str) -> Optional[List[Dict[str, Any]]]:
+    def get_query_result(self, query_hash: Hashable) -> Optional[Tuple[Tuple, ...]]:
         """Get cached query result"""
         result = self.query_cache.get(query_hash)
         if result is not None:
@@ -106,9 +191,35 @@ class MemoryCache:
             self.stats['misses'] += 1
             return None
     
-    def cache_query_result(self, query_hash: str, result: List[Dict[str, Any]], ttl: int = 300):
-        """Cache query result"""
-        self.query_cache.put(query_hash, result, ttl)
+    def peek_query_result(self, query_hash: Hashable) -> Optional[Tuple[Tuple, ...]]:
+        """Get cached query result, without counting a miss when it is absent
+        
+        For callers that fall back to a path that looks the key up again.
+        """
+        if query_hash not in self.query_cache:
+            return None
+        return self.get_query_result(query_hash)
+    
+    def cache_query_result(self, query_hash: Hashable, result: Tuple[Tuple, ...],
+                           tables: Optional[List[str]] = None):
+        """Cache query result, registering it under the tables it reads"""
+        self.query_cache.put(query_hash, result)
+        if not tables or query_hash in self._query_tables:
+            return
+        if query_hash not in self.query_cache.cache:
+            return  # Turned away by admission; nothing to invalidate later
+        self._query_tables[query_hash] = tables = tuple(tables)
+        for table_name in tables:
+            self.table_to_queries[table_name].add(query_hash)
+    
+    def _forget_query(self, query_hash: Hashable):
+        """Drop a query key from the table index once the cache no longer holds it"""
+        for table_name in self._query_tables.pop(query_hash, ()):
+            keys = self.table_to_queries.get(table_name)
+            if keys is not None:
+                keys.discard(query_hash)
+                if not keys:
+                    del self.table_to_queries[table_name]
     
     def get_table_metadata(self, table_name: str) -> Optional[Dict[str, Any]]:
         """Get cached table metadata"""
@@ -116,12 +227,15 @@ class MemoryCache:
     
     def cache_table_metadata(self, table_name: str, metadata: Dict[str, Any]):
         """Cache table metadata"""
-        self.table_cache.put(f"table_meta_{table_name}", metadata, ttl=3600)  # 1 hour TTL
+        self.table_cache.put(f"table_meta_{table_name}", metadata)
     
     def invalidate_table(self, table_name: str):
         """Invalidate all cache entries for a table"""
-        self.query_cache.invalidate(table_name)
-        self.table_cache.invalidate(f"table_meta_{table_name}")
+        keys = self.table_to_queries.pop(table_name, ())
+        self.query_cache.invalidate(keys)
+        for query_hash in keys:
+            self._forget_query(query_hash)
+        self.table_cache.invalidate([f"table_meta_{table_name}"])
     
     def cleanup(self):
         """Clean up expired entries"""
@@ -142,67 +256,111 @@ class MemoryCache:
         }
 
 class InMemoryTable:
-    """In-memory representation of a table for fast operations"""
+    """In-memory representation of a table for fast operations
+    
+    Data is column-oriented: one list per column plus a deleted mask. WHERE
+    scans touch only the filtered column and SELECT gathers only the
+    projected columns, building result tuples without per-row dicts.
+    """
     
-    def __init__(self, name: str, columns: List[str], rows: List[Dict[str, Any]]):
+    def __init__(self, name: str, columns: List[str], cols: Dict[str, List[Any]]):
         self.name = name
         self.columns = columns
-        self.rows = rows
-        self.indexes = {}
-        self._build_indexes()
-    
-    def _build_indexes(self):
-        """Build in-memory indexes for fast lookups"""
-        for col in self.columns:
-            self.indexes[col] = {}
-            for i, row in enumerate(self.rows):
-                if col in row and '__deleted__' not in row:
-                    value = row[col]
-                    if value not in self.indexes[col]:
-                        self.indexes[col][value] = []
-                    self.indexes[col][value].append(i)
+        self.cols = cols
+        self.size = len(cols[columns[0]]) if columns else 0
+        self.deleted = bytearray(self.size)
+        self._tombstones = 0
+        self.indexes = {}  # Built per column on first equality lookup
+    
+    def _ensure_index(self, col: str) -> Optional[Dict[Any, List[int]]]:
+        """Return the equality index for a column, building it if needed"""
+        index = self.indexes.get(col)
+        if index is None and col in self.cols:
+            index = defaultdict(list)
+            values = self.cols[col]
+            positions = range(len(values))
+            if self._tombstones:
+                positions = compress(positions, map(not_, self.deleted))
+            for i in positions:
+                index[values[i]].append(i)
+            self.indexes[col] = index
+        return index
+    
+    def _live_positions(self) -> Optional[List[int]]:
+        """Positions of non-deleted rows, or None when every row is live"""
+        if not self._tombstones:
+            return None
+        return list(compress(range(self.size), map(not_, self.deleted)))
+    
+    def project(self, columns: List[str], positions: Optional[List[int]]) -> List[Tuple]:
+        """Build result tuples of the given columns at positions (None: all rows)
+        
+        ['*'] selects every column; unknown columns read as NULL.
+        """
+        names = self.columns if columns == ['*'] else columns
+        count = self.size if positions is None else len(positions)
+        if not count or not names:
+            return [()] * count
+        
+        gather = None
+        if positions is not None and count > 1:
+            gather = itemgetter(*positions)
+        parts = []
+        for name in names:
+            values = self.cols.get(name)
+            if values is None:
+                parts.append(repeat(None, count))
+            elif positions is None:
+                parts.append(values)
+            elif gather is None:
+                parts.append((values[positions[0]],))
+            else:
+                parts.append(gather(values))
+        return list(zip(*parts))
+    
+    def select_tuples(self, columns: List[str],
+                      where: Optional[Dict[str, Any]] = None) -> List[Tuple]:
+        """SELECT columns [WHERE column op value] straight to result tuples"""
+        if where:
+            positions = self.where_indices(where['column'], where['operator'], where['value'])
+        else:
+            positions = self._live_positions()
+        return self.project(columns, positions)
     
     def select_all(self) -> List[Dict[str, Any]]:
         """Select all non-deleted rows"""
-        return [row for row in self.rows if '__deleted__' not in row]
+        names = self.columns
+        return [dict(zip(names, values)) for values in self.select_tuples(['*'])]
     
     def select_where(self, column: str, operator: str, value: Any) -> List[Dict[str, Any]]:
         """Select rows matching condition using indexes when possible"""
-        if operator == '=' and column in self.indexes and value in self.indexes[column]:
+        names = self.columns
+        positions = self.where_indices(column, operator, value)
+        return [dict(zip(names, values)) for values in self.project(['*'], positions)]
+    
+    def where_indices(self, column: str, operator: str, value: Any) -> List[int]:
+        """Return positions of non-deleted rows matching condition"""
+        deleted = self.deleted
+        if operator == '=':
+            index = self._ensure_index(column)
+            if index is None:
+                return []
             # Use index for exact match
-            row_indices = self.indexes[column][value]
-            return [self.rows[i] for i in row_indices if '__deleted__' not in self.rows[i]]
-        else:
-            # Full scan
-            results = []
-            for row in self.rows:
-                if '__deleted__' in row:
-                    continue
-                if self._evaluate_condition(row, column, operator, value):
-                    results.append(row)
-            return results
-    
-    def _evaluate_condition(self, row: Dict[str, Any], column: str, operator: str, value: Any) -> bool:
-        """Evaluate WHERE condition"""
-        if column not in row:
-            return False
+            return [i for i in index.get(value, ()) if not deleted[i]]
         
-        row_value = row[column]
+        values = self.cols.get(column)
+        op_fn = COMPARE_OPS.get(operator)
+        if values is None or op_fn is None:
+            return []
         
-        if operator == '=':
-            return row_value == value
-        elif operator == '!=':
-            return row_value != value
-        elif operator == '<':
-            return row_value < value
-        elif operator == '<=':
-            return row_value <= value
-        elif operator == '>':
-            return row_value > value
-        elif operator == '>=':
-            return row_value >= value
-        else:
-            return False
+        # Column scan
+        return scan_column(values, op_fn, value, deleted if self._tombstones else None)
+    
+    def invalidate_row(self, i: int):
+        """Mark the row at position i as deleted"""
+        if not self.deleted[i]:
+            self.deleted[i] = 1
+            self._tombstones += 1
 
 class MemoryEngine:
     """Memory engine for fast in-memory table operations"""
@@ -211,9 +369,11 @@ class MemoryEngine:
         self.cache = cache
         self.memory_tables = {}
     
-    def load_table_into_memory(self, table_name: str, rows: List[Dict[str, Any]], columns: List[str]):
-        """Load table data into memory for fast access"""
-        self.memory_tables[table_name] = InMemoryTable(table_name, columns, rows)
+    def load_table_into_memory(self, table_name: str, cols: Dict[str, List[Any]],
+                               columns: List[str]) -> InMemoryTable:
+        """Load table data (one list of live values per column) into memory"""
+        table = self.memory_tables[table_name] = InMemoryTable(table_name, columns, cols)
+        return table
     
     def get_memory_table(self, table_name: str) -> Optional[InMemoryTable]:
         """Get in-memory table if available"""
@@ -3,16 +3,13 @@
 MandukyaDB CLI - Interactive database shell
 """
 
-import sys
 import os
 import cmd
 import readline
+from time import perf_counter
 
-# Add src to path for importing
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
-
-from src.mandukya_db import MandukyaDB
-from src.exceptions import MandukyaError
+from .mandukya_db import MandukyaDB
+from .exceptions import MandukyaError
 
 class MandukyaCLI(cmd.Cmd):
     """Interactive CLI for MandukyaDB"""
@@ -43,7 +40,7 @@ Example: CREATE TABLE students (id INTEGER, name TEXT);
         super().__init__()
         self.database_path = database_path or ":memory:"
         self.db = None
-        self.multiline_buffer = ""
+        self.multiline_buffer = []
         
     def preloop(self):
         """Initialize database connection"""
@@ -67,12 +64,12 @@ Example: CREATE TABLE students (id INTEGER, name TEXT);
             return
         
         # Handle multi-line SQL statements
-        self.multiline_buffer += line + " "
+        self.multiline_buffer.append(line)
         
         # Check if statement is complete (ends with semicolon)
         if line.strip().endswith(';'):
-            sql = self.multiline_buffer.strip()
-            self.multiline_buffer = ""
+            sql = " ".join(self.multiline_buffer).strip()
+            self.multiline_buffer.clear()
             self._execute_sql(sql)
         else:
             # Continue multi-line input
@@ -83,9 +80,9 @@ Example: CREATE TABLE students (id INTEGER, name TEXT);
         self.prompt = "mandukya> "  # Reset prompt
         
         try:
-            start_time = __import__('time').time()
+            start_time = perf_counter()
             result = self.db.execute(sql)
-            end_time = __import__('time').time()
+            end_time = perf_counter()
             
             # Display results based on statement type
             if isinstance(result, list):
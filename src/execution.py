@@ -3,69 +3,162 @@ Execution Engine - Turiya (Pure Consciousness State)
 The final execution layer that coordinates all other components
 """
 
-import hashlib
-from typing import List, Dict, Any, Optional, Union, Tuple
-from .parser import SQLParser, CreateTableStatement, InsertStatement, SelectStatement, DeleteStatement, DescribeStatement
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import replace
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Union, Tuple, Iterable, Sequence
+from .parser import (SQLParser, CreateTableStatement, InsertStatement, SelectStatement,
+                     CountStatement, DeleteStatement, DescribeStatement, Placeholder)
 from .storage import StorageEngine
 from .cache import MemoryCache, MemoryEngine
 from .exceptions import ExecutionError, ParseError, StorageError
 
-class QueryOptimizer:
-    """Simple query optimizer for better performance"""
+class PreparedStatement:
+    """A statement parsed once and executed many times with bound parameters
     
-    def __init__(self):
-        pass
+    Parameters are written as ``?`` in the SQL text and bound positionally.
+    """
     
-    def optimize_select(self, stmt: SelectStatement, table_metadata: Dict[str, Any]) -> SelectStatement:
-        """Optimize SELECT statement"""
-        # Simple optimization: if WHERE clause uses indexed column, note it
-        if stmt.where_clause and 'indexes' in table_metadata:
-            column = stmt.where_clause['column']
-            if column in table_metadata['indexes']:
-                # Mark as optimizable for index usage
-                stmt.where_clause['_use_index'] = True
-        
-        return stmt
+    def __init__(self, engine: 'ExecutionEngine', sql: str, statement):
+        self.engine = engine
+        self.sql = sql
+        self.statement = statement
+        self.param_count = getattr(statement, 'param_count', 0)
+    
+    def bind_values(self, params: Sequence[Any]) -> List[Any]:
+        """Substitute parameters into an INSERT's value list"""
+        self._check_params(params)
+        return [params[v.index] if type(v) is Placeholder else v
+                for v in self.statement.values]
+    
+    def bind(self, params: Sequence[Any] = ()):
+        """Return a concrete statement with parameters substituted"""
+        self._check_params(params)
+        stmt = self.statement
+        if not self.param_count:
+            return stmt
+        if type(stmt) is InsertStatement:
+            return replace(stmt, values=self.bind_values(params), param_count=0)
+        where = dict(stmt.where_clause, value=params[0])
+        return replace(stmt, where_clause=where, param_count=0)
+    
+    def execute(self, params: Sequence[Any] = ()) -> Union[List[Tuple], int, str]:
+        """Execute with the given parameters"""
+        return self.engine.execute_prepared(self, params)
+    
+    def executemany(self, seq_of_params: Iterable[Sequence[Any]]) -> int:
+        """Execute once per parameter set, return total affected rows"""
+        return self.engine.executemany_prepared(self, seq_of_params)
+    
+    def _check_params(self, params: Sequence[Any]):
+        if len(params) != self.param_count:
+            raise ExecutionError(f"Expected {self.param_count} parameters, got {len(params)}")
+    
+    def __repr__(self):
+        return f"PreparedStatement({self.sql!r})"
 
 class ExecutionEngine:
     """Execution engine implementing the Turiya (Pure Consciousness) principle"""
     
-    def __init__(self, database_path: str, cache_size: int = 1000):
+    def __init__(self, database_path: Optional[str], cache_size: int = 1000):
         self.parser = SQLParser()
         self.storage = StorageEngine(database_path)
         self.cache = MemoryCache(cache_size)
         self.memory_engine = MemoryEngine(self.cache)
-        self.optimizer = QueryOptimizer()
+        
+        # Statement type -> handler (SELECT is routed separately, it needs the cache key)
+        self._dispatch = {
+            CreateTableStatement: self._execute_create_table,
+            InsertStatement: self._execute_insert,
+            DeleteStatement: self._execute_delete,
+            DescribeStatement: self._execute_describe,
+            CountStatement: self._execute_count,
+        }
+        
+        # Writes since the last storage commit; flushed every _commit_batch
+        # unless begin() has deferred commits until the next flush()
+        self._pending_writes = 0
+        self._commit_batch = 128
+        self._deferred = False
+        
+        # Parsed statements keyed by SQL text (LRU bounded)
+        self._ast_cache = OrderedDict()
+        self._ast_cache_max = 256
+        
+        # SQL text -> result cache key of SELECTs seen before, for execute()'s
+        # early cache probe
+        self._select_keys: Dict[str, Tuple] = {}
+        
+        # Parsed templates keyed by literal-free SQL text; None marks shapes
+        # that cannot be templated (literals outside INSERT values/WHERE)
+        self._template_cache = OrderedDict()
         
         # Execution statistics
         self.stats = {
             'queries_executed': 0,
             'cache_hits': 0,
-            'cache_misses': 0
+            'cache_misses': 0,
+            'parse_cache_hits': 0
         }
     
-    def execute(self, sql: str) -> Union[List[Tuple], int, str]:
-        """Execute SQL statement and return results"""
+    def execute(self, sql: str, params: Optional[Sequence[Any]] = None) -> Union[List[Tuple], int, str]:
+        """Execute SQL statement and return results
+        
+        With params, ``?`` markers are bound positionally and the parsed
+        statement is shared by every call with the same SQL text.
+        """
+        if params is not None:
+            return self.execute_prepared(self.prepare(sql), params)
+        
+        # A cached SELECT result skips parsing and dispatch entirely
+        key = self._select_keys.get(sql)
+        if key is not None:
+            cached_result = self.cache.peek_query_result(key)
+            if cached_result is not None:
+                self.stats['queries_executed'] += 1
+                self.stats['cache_hits'] += 1
+                return list(cached_result)
+        
+        with self._translate_errors():
+            statement = self._parse(sql)
+            if getattr(statement, 'param_count', 0):
+                raise ExecutionError("Statement has unbound '?' parameters; use prepare()")
+            return self._execute_statement(statement, sql)
+    
+    def execute_statement(self, statement) -> Union[List[Tuple], int, str]:
+        """Execute a statement built without SQL text"""
+        with self._translate_errors():
+            return self._execute_statement(statement, None)
+    
+    def prepare(self, sql: str) -> PreparedStatement:
+        """Parse SQL once for repeated execution with ``?`` parameters"""
+        with self._translate_errors():
+            return PreparedStatement(self, sql, self._parse(sql))
+    
+    def execute_prepared(self, prepared: PreparedStatement,
+                         params: Sequence[Any] = ()) -> Union[List[Tuple], int, str]:
+        """Execute a prepared statement with bound parameters"""
+        with self._translate_errors():
+            return self._execute_statement(prepared.bind(params), prepared.sql, params)
+    
+    def executemany_prepared(self, prepared: PreparedStatement,
+                             seq_of_params: Iterable[Sequence[Any]]) -> int:
+        """Execute a prepared INSERT or DELETE once per parameter set"""
+        with self._translate_errors():
+            stmt = prepared.statement
+            if type(stmt) is InsertStatement:
+                return self._execute_insert_many(prepared, seq_of_params)
+            if type(stmt) is not DeleteStatement:
+                raise ExecutionError("executemany supports only INSERT and DELETE")
+            return sum(self._execute_statement(prepared.bind(params), prepared.sql, params)
+                       for params in seq_of_params)
+    
+    @contextmanager
+    def _translate_errors(self):
+        """Re-raise failures from any layer as ExecutionError"""
         try:
-            self.stats['queries_executed'] += 1
-            
-            # Parse SQL
-            statement = self.parser.parse(sql)
-            
-            # Route to appropriate execution method
-            if isinstance(statement, CreateTableStatement):
-                return self._execute_create_table(statement)
-            elif isinstance(statement, InsertStatement):
-                return self._execute_insert(statement)
-            elif isinstance(statement, SelectStatement):
-                return self._execute_select(statement, sql)
-            elif isinstance(statement, DeleteStatement):
-                return self._execute_delete(statement)
-            elif isinstance(statement, DescribeStatement):
-                return self._execute_describe(statement)
-            else:
-                raise ExecutionError(f"Unsupported statement type: {type(statement)}")
-                
+            yield
         except ParseError as e:
             raise ExecutionError(f"Parse error: {e}")
         except StorageError as e:
@@ -73,6 +166,61 @@ class ExecutionEngine:
         except Exception as e:
             raise ExecutionError(f"Execution error: {e}")
     
+    def _parse(self, sql: str):
+        """Parse SQL, reusing the AST for repeated statements"""
+        statement = self._ast_cache.get(sql)
+        if statement is None:
+            statement = self._parse_uncached(sql)
+            self._ast_cache[sql] = statement
+            if len(self._ast_cache) > self._ast_cache_max:
+                self._ast_cache.popitem(last=False)
+        else:
+            self._ast_cache.move_to_end(sql)
+            self.stats['parse_cache_hits'] += 1
+        return statement
+    
+    def _parse_uncached(self, sql: str):
+        """Parse SQL, sharing one template across statements differing only in literals"""
+        shape, literals = self.parser.parametrize(sql)
+        if not literals:
+            return self.parser.parse(sql)
+        
+        cache = self._template_cache
+        if shape in cache:
+            template = cache[shape]
+            cache.move_to_end(shape)
+        else:
+            try:
+                template = self.parser.parse(shape)
+            except Exception:
+                template = None
+            # Every literal must have become a parameter, and nothing else
+            if getattr(template, 'param_count', 0) != len(literals):
+                template = None
+            cache[shape] = template
+            if len(cache) > self._ast_cache_max:
+                cache.popitem(last=False)
+        
+        # A shape shared with a statement that has its own ? markers does not fit
+        if template is None or template.param_count != len(literals):
+            return self.parser.parse(sql)
+        return self.parser.bind_literals(template, literals)
+    
+    def _execute_statement(self, statement, sql: Optional[str],
+                           params: Optional[Sequence[Any]] = None) -> Union[List[Tuple], int, str]:
+        """Route a parsed statement to its execution method"""
+        self.stats['queries_executed'] += 1
+        
+        # Only SELECTs touch the result cache, so only they build a cache key
+        stmt_type = type(statement)
+        if stmt_type is SelectStatement:
+            return self._execute_select(statement, sql, params)
+        
+        handler = self._dispatch.get(stmt_type)
+        if handler is None:
+            raise ExecutionError(f"Unsupported statement type: {stmt_type}")
+        return handler(statement)
+    
     def _execute_create_table(self, stmt: CreateTableStatement) -> str:
         """Execute CREATE TABLE statement"""
         self.storage.create_table(stmt.table_name, stmt.columns)
@@ -83,6 +231,7 @@ class ExecutionEngine:
             'indexes': {}
         }
         self.cache.cache_table_metadata(stmt.table_name, metadata)
+        self._record_writes(1)
         
         return f"Table '{stmt.table_name}' created successfully"
     
@@ -98,21 +247,49 @@ class ExecutionEngine:
         self.cache.invalidate_table(stmt.table_name)
         self.memory_engine.invalidate_memory_table(stmt.table_name)
         
-        # Persist changes
-        self.storage.commit()
+        # Persist changes (batched)
+        self._record_writes(1)
         
         return row_id
     
-    def _execute_select(self, stmt: SelectStatement, original_sql: str) -> List[Tuple]:
+    def _execute_insert_many(self, prepared: PreparedStatement,
+                             seq_of_params: Iterable[Sequence[Any]]) -> int:
+        """Insert one row per parameter set, invalidating and committing once"""
+        stmt = prepared.statement
+        table = self.storage.get_table(stmt.table_name)
+        if not table:
+            raise ExecutionError(f"Table '{stmt.table_name}' does not exist")
+        
+        count = 0
+        try:
+            for params in seq_of_params:
+                table.insert_row(prepared.bind_values(params))
+                count += 1
+        finally:
+            self.stats['queries_executed'] += count
+            if count:
+                self.cache.invalidate_table(stmt.table_name)
+                self.memory_engine.invalidate_memory_table(stmt.table_name)
+                self._record_writes(count)
+        
+        return count
+    
+    def _execute_select(self, stmt: SelectStatement, original_sql: Optional[str],
+                        params: Optional[Sequence[Any]] = None) -> List[Tuple]:
         """Execute SELECT statement with caching"""
-        # Generate query hash for caching
-        query_hash = self._generate_query_hash(original_sql)
+        # Generate query hash for caching; remember it for the raw SQL text
+        query_hash = self._generate_query_hash(stmt)
+        if original_sql is not None and params is None:
+            select_keys = self._select_keys
+            if len(select_keys) >= self._ast_cache_max * 4:
+                select_keys.clear()
+            select_keys[original_sql] = query_hash
         
         # Check cache first
         cached_result = self.cache.get_query_result(query_hash)
         if cached_result is not None:
             self.stats['cache_hits'] += 1
-            return self._format_select_result(cached_result, stmt.columns)
+            return list(cached_result)
         
         self.stats['cache_misses'] += 1
         
@@ -123,45 +300,36 @@ class ExecutionEngine:
         
         # Try in-memory table first
         memory_table = self.memory_engine.get_memory_table(stmt.table_name)
-        if memory_table:
-            rows = self._execute_select_memory(stmt, memory_table)
+        if memory_table is None and table.row_count() < 1000:  # Arbitrary threshold
+            # Load small tables into memory with one scan and answer from there
+            memory_table = self.memory_engine.load_table_into_memory(
+                stmt.table_name, table.live_columns(), table.column_names
+            )
+        
+        if memory_table is not None:
+            # Column store builds result tuples directly
+            result = memory_table.select_tuples(stmt.columns, stmt.where_clause)
         else:
             # Execute on storage engine
             rows = self._execute_select_storage(stmt, table)
-            
-            # Load into memory for future queries if result set is reasonable size
-            if len(rows) < 1000:  # Arbitrary threshold
-                all_rows = table.select_all()
-                self.memory_engine.load_table_into_memory(
-                    stmt.table_name, all_rows, table.column_names
-                )
+            result = self._format_select_result(rows, stmt.columns)
         
-        # Cache result
-        self.cache.cache_query_result(query_hash, rows)
+        # Cache the formatted result; callers get their own list
+        self.cache.cache_query_result(query_hash, tuple(result), tables=[stmt.table_name])
         
-        return self._format_select_result(rows, stmt.columns)
-    
-    def _execute_select_memory(self, stmt: SelectStatement, memory_table) -> List[Dict[str, Any]]:
-        """Execute SELECT on in-memory table"""
-        if stmt.where_clause:
-            return memory_table.select_where(
-                stmt.where_clause['column'],
-                stmt.where_clause['operator'], 
-                stmt.where_clause['value']
-            )
-        else:
-            return memory_table.select_all()
+        return result
     
     def _execute_select_storage(self, stmt: SelectStatement, table) -> List[Dict[str, Any]]:
         """Execute SELECT on storage engine"""
         if stmt.where_clause:
-            return table.select_where(
+            rows = table.select_where(
                 stmt.where_clause['column'],
                 stmt.where_clause['operator'],
                 stmt.where_clause['value']
             )
         else:
-            return table.select_all()
+            rows = table.select_all()
+        return rows
     
     def _execute_delete(self, stmt: DeleteStatement) -> int:
         """Execute DELETE statement"""
@@ -169,28 +337,40 @@ class ExecutionEngine:
         if not table:
             raise ExecutionError(f"Table '{stmt.table_name}' does not exist")
         
+        memory_table = self.memory_engine.get_memory_table(stmt.table_name)
+        
         if stmt.where_clause:
-            deleted_count = table.delete_where(
-                stmt.where_clause['column'],
-                stmt.where_clause['operator'],
-                stmt.where_clause['value']
-            )
+            column = stmt.where_clause['column']
+            operator = stmt.where_clause['operator']
+            value = stmt.where_clause['value']
+            
+            # Tombstone matching rows in the memory copy instead of dropping it
+            if memory_table:
+                for i in memory_table.where_indices(column, operator, value):
+                    memory_table.invalidate_row(i)
+            
+            deleted_count = table.delete_where(column, operator, value)
         else:
             # Delete all rows (dangerous!)
-            all_rows = table.select_all()
-            deleted_count = len(all_rows)
-            for row in all_rows:
-                row['__deleted__'] = True
+            deleted_count = table.delete_all()
+            self.memory_engine.invalidate_memory_table(stmt.table_name)
         
         # Invalidate cache
         self.cache.invalidate_table(stmt.table_name)
-        self.memory_engine.invalidate_memory_table(stmt.table_name)
         
-        # Persist changes
-        self.storage.commit()
+        # Persist changes (batched)
+        self._record_writes(1)
         
         return deleted_count
     
+    def _execute_count(self, stmt: CountStatement) -> List[Tuple]:
+        """Execute SELECT COUNT(*) from row counts, without materializing rows"""
+        table = self.storage.get_table(stmt.table_name)
+        if not table:
+            raise ExecutionError(f"Table '{stmt.table_name}' does not exist")
+        
+        return [(table.count(stmt.where_clause),)]
+    
     def _execute_describe(self, stmt: DescribeStatement) -> List[Tuple]:
         """Execute DESCRIBE statement"""
         table = self.storage.get_table(stmt.table_name)
@@ -205,28 +385,41 @@ class ExecutionEngine:
         
         return results
     
-    def _generate_query_hash(self, sql: str) -> str:
-        """Generate hash for query caching"""
-        return hashlib.md5(sql.encode()).hexdigest()
+    def _generate_query_hash(self, stmt: SelectStatement) -> Tuple:
+        """Generate key for query caching
+        
+        The key is built from the parsed statement, so spelling variants of
+        one query (case, whitespace, a trailing ';', prepared vs literal
+        values, the Python API) share a cache entry.
+        """
+        where = stmt.where_clause
+        if where is not None:
+            where = (where['column'], where['operator'], where['value'])
+        return (stmt.table_name, tuple(stmt.columns), where)
     
     def _format_select_result(self, rows: List[Dict[str, Any]], columns: List[str]) -> List[Tuple]:
-        """Format SELECT result as list of tuples"""
-        result = []
-        
-        for row in rows:
-            if '__deleted__' in row and row['__deleted__']:
-                continue
-                
-            if columns == ['*']:
-                # Return all columns (excluding internal ones)
-                row_tuple = tuple(v for k, v in row.items() if not k.startswith('__'))
-            else:
-                # Return specified columns
-                row_tuple = tuple(row.get(col) for col in columns)
-            
-            result.append(row_tuple)
+        """Format SELECT result as list of tuples (rows are already live)"""
+        if not rows:
+            return []
         
-        return result
+        first = rows[0]
+        if columns == ['*']:
+            # Rows carry exactly the table's columns, in order
+            return [tuple(row.values()) for row in rows]
+        else:
+            keys = columns
+            if not all(k in first for k in keys):
+                # Unknown columns read as NULL
+                return [tuple(row.get(col) for col in keys) for row in rows]
+        
+        if not keys:
+            return [() for _ in rows]
+        
+        # Rows of a table share one schema, so a single C-level getter projects them all
+        getter = itemgetter(*keys)
+        if len(keys) == 1:
+            return [(getter(row),) for row in rows]
+        return [getter(row) for row in rows]
     
     def get_stats(self) -> Dict[str, Any]:
         """Get execution statistics"""
@@ -238,11 +431,31 @@ class ExecutionEngine:
             'tables': list(self.storage.tables.keys())
         }
     
+    def get_tables(self) -> List[str]:
+        """Get list of table names"""
+        return list(self.storage.tables)
+    
+    def _record_writes(self, count: int):
+        """Count buffered writes, committing storage once a batch fills up"""
+        self._pending_writes += count
+        if self._pending_writes >= self._commit_batch and not self._deferred:
+            self.flush()
+    
+    def begin(self):
+        """Defer automatic batch commits until the next flush()"""
+        self._deferred = True
+    
+    def flush(self):
+        """Commit buffered writes to storage"""
+        self.storage.commit()
+        self._pending_writes = 0
+        self._deferred = False
+    
     def cleanup_cache(self):
         """Clean up expired cache entries"""
         self.cache.cleanup()
     
     def close(self):
         """Close database connection and cleanup"""
-        self.storage.commit()
+        self.flush()
         self.cleanup_cache()
\ No newline at end of file
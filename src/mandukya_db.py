@@ -3,9 +3,12 @@ MandukyaDB - Main Database Class
 Integrates all four states of consciousness into a unified API
 """
 
-import os
-from typing import List, Dict, Any, Union, Tuple, Optional
-from .execution import ExecutionEngine
+import weakref
+from contextlib import contextmanager
+from typing import List, Dict, Any, Union, Tuple, Optional, Iterable, Sequence
+from .execution import ExecutionEngine, PreparedStatement
+from .parser import (Column, CreateTableStatement, InsertStatement,
+                     SelectStatement, DeleteStatement)
 from .exceptions import MandukyaError
 
 class MandukyaDB:
@@ -27,24 +30,23 @@ class MandukyaDB:
             database_path: Path to database file (":memory:" for in-memory database)
             cache_size: Size of the query result cache
         """
-        if database_path == ":memory:":
-            # Create temporary file for in-memory database
-            import tempfile
-            self.database_path = os.path.join(tempfile.gettempdir(), "mandukya_temp.db")
-            self._is_memory = True
-        else:
-            self.database_path = database_path
-            self._is_memory = False
+        self.database_path = database_path
+        self._is_memory = database_path == ":memory:"
         
-        # Initialize the execution engine (Turiya) which coordinates all other layers
-        self.engine = ExecutionEngine(self.database_path, cache_size)
+        # Initialize the execution engine (Turiya) which coordinates all other layers;
+        # an in-memory database has no backing file at all
+        self.engine = ExecutionEngine(None if self._is_memory else database_path, cache_size)
+        # Pending writes are flushed even if close() is never called: when the
+        # object is collected or, at the latest, when the interpreter exits
+        self._finalizer = weakref.finalize(self, self.engine.close)
         
-    def execute(self, sql: str) -> Union[List[Tuple], int, str]:
+    def execute(self, sql: str, params: Optional[Sequence[Any]] = None) -> Union[List[Tuple], int, str]:
         """
         Execute SQL statement
         
         Args:
             sql: SQL statement to execute
+            params: Values for ``?`` markers in sql, bound in order
             
         Returns:
             For SELECT: List of tuples representing rows
@@ -53,7 +55,39 @@ class MandukyaDB:
             For DELETE: Number of deleted rows
         """
         try:
-            return self.engine.execute(sql)
+            return self.engine.execute(sql, params)
+        except Exception as e:
+            raise MandukyaError(str(e))
+    
+    def prepare(self, sql: str) -> PreparedStatement:
+        """
+        Parse SQL once for repeated execution
+        
+        Args:
+            sql: SQL statement using ``?`` for parameter values
+            
+        Returns:
+            PreparedStatement whose execute(params) and executemany(seq)
+            skip parsing entirely
+        """
+        try:
+            return self.engine.prepare(sql)
+        except Exception as e:
+            raise MandukyaError(str(e))
+    
+    def executemany(self, sql: str, seq_of_params: Iterable[Sequence[Any]]) -> int:
+        """
+        Execute an INSERT or DELETE once per parameter set
+        
+        Args:
+            sql: SQL statement using ``?`` for parameter values
+            seq_of_params: Iterable of parameter sequences
+            
+        Returns:
+            Total number of rows inserted or deleted
+        """
+        try:
+            return self.prepare(sql).executemany(seq_of_params)
         except Exception as e:
             raise MandukyaError(str(e))
     
@@ -68,12 +102,10 @@ class MandukyaDB:
         Returns:
             Success message
         """
-        column_defs = []
-        for col_name, col_type in columns:
-            column_defs.append(f"{col_name} {col_type}")
-        
-        sql = f"CREATE TABLE {name} ({', '.join(column_defs)})"
-        return self.execute(sql)
+        # Types are upper-cased as the parser would
+        statement = CreateTableStatement(
+            name, [Column(col_name, col_type.upper()) for col_name, col_type in columns])
+        return self._execute_statement(statement)
     
     def insert(self, table: str, values: List[Any]) -> int:
         """
@@ -86,15 +118,8 @@ class MandukyaDB:
         Returns:
             Row ID of inserted row
         """
-        value_strs = []
-        for value in values:
-            if isinstance(value, str):
-                value_strs.append(f"'{value}'")
-            else:
-                value_strs.append(str(value))
-        
-        sql = f"INSERT INTO {table} VALUES ({', '.join(value_strs)})"
-        return self.execute(sql)
+        statement = InsertStatement(table, None, list(values))
+        return self._execute_statement(statement)
     
     def select(self, table: str, columns: List[str] = None, where: Dict[str, Any] = None) -> List[Tuple]:
         """
@@ -108,26 +133,9 @@ class MandukyaDB:
         Returns:
             List of tuples representing matching rows
         """
-        if columns is None:
-            columns_str = "*"
-        else:
-            columns_str = ", ".join(columns)
-        
-        sql = f"SELECT {columns_str} FROM {table}"
-        
-        if where:
-            column = where['column']
-            operator = where.get('operator', '=')
-            value = where['value']
-            
-            if isinstance(value, str):
-                value_str = f"'{value}'"
-            else:
-                value_str = str(value)
-            
-            sql += f" WHERE {column} {operator} {value_str}"
-        
-        return self.execute(sql)
+        columns = ['*'] if columns is None else list(columns)
+        where_clause = self._where_clause(where)
+        return self._execute_statement(SelectStatement(columns, table, where_clause))
     
     def delete(self, table: str, where: Dict[str, Any] = None) -> int:
         """
@@ -140,21 +148,24 @@ class MandukyaDB:
         Returns:
             Number of deleted rows
         """
-        sql = f"DELETE FROM {table}"
-        
-        if where:
-            column = where['column']
-            operator = where.get('operator', '=')
-            value = where['value']
-            
-            if isinstance(value, str):
-                value_str = f"'{value}'"
-            else:
-                value_str = str(value)
-            
-            sql += f" WHERE {column} {operator} {value_str}"
-        
-        return self.execute(sql)
+        statement = DeleteStatement(table, self._where_clause(where))
+        return self._execute_statement(statement)
+    
+    def _execute_statement(self, statement) -> Union[List[Tuple], int, str]:
+        """Run a statement built by the Python API, skipping the SQL parser"""
+        try:
+            return self.engine.execute_statement(statement)
+        except Exception as e:
+            raise MandukyaError(str(e))
+    
+    @staticmethod
+    def _where_clause(where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Normalize an API where dict to the parser's where_clause shape"""
+        if not where:
+            return None
+        return {'column': where['column'],
+                'operator': where.get('operator', '='),
+                'value': where['value']}
     
     def get_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
@@ -162,27 +173,47 @@ class MandukyaDB:
     
     def get_tables(self) -> List[str]:
         """Get list of table names"""
-        stats = self.get_stats()
-        return stats.get('tables', [])
+        return self.engine.get_tables()
     
     def cleanup_cache(self):
         """Clean up expired cache entries"""
         self.engine.cleanup_cache()
     
+    def begin(self):
+        """Start a write batch
+        
+        Writes are held in memory until commit() (or close()) instead of
+        being flushed every few hundred statements, so a bulk load costs a
+        single disk write.
+        """
+        self.engine.begin()
+    
     def commit(self):
-        """Commit any pending changes to disk"""
-        self.engine.storage.commit()
+        """Commit any pending changes to disk
+        
+        INSERT and DELETE are persisted in batches; call this (or close())
+        to make every write so far durable.
+        """
+        self.engine.flush()
+    
+    @contextmanager
+    def batch(self):
+        """
+        Batch every write in a with-block into one commit
+        
+        Wraps begin() and commit(). This is not a transaction: statements
+        take effect as they execute, nothing is rolled back, and the commit
+        runs when the block exits even if it raises.
+        """
+        self.begin()
+        try:
+            yield self
+        finally:
+            self.commit()
     
     def close(self):
         """Close database connection"""
-        self.engine.close()
-        
-        # Clean up temporary file for in-memory databases
-        if self._is_memory and os.path.exists(self.database_path):
-            try:
-                os.remove(self.database_path)
-            except:
-                pass  # Ignore cleanup errors
+        self._finalizer()
     
     def __enter__(self):
         """Context manager entry"""
@@ -4,11 +4,49 @@ Handles abstract query parsing and planning
 """
 
 import re
-from typing import List, Dict, Any, Optional, Union
-from dataclasses import dataclass
+import sys
+from typing import List, Dict, Any, Optional, Tuple, Union
+from dataclasses import dataclass, replace
 from .exceptions import ParseError
 
-@dataclass
+# Characters that end a bare word in _tokenize
+_WHITESPACE = frozenset(' \t\n\r\f\v')
+_DELIMITERS = _WHITESPACE | frozenset('(),;')
+
+# Literals that parametrize() lifts out: quoted string | standalone unsigned number
+_LITERAL_RE = re.compile(r"'([^']*)'|(?<![\w.-])(\d+(?:\.\d+)?)(?![\w.])")
+
+class _Quoted(str):
+    """A token that was a quoted string literal, so never a ``?`` marker"""
+    __slots__ = ()
+
+def _is_param(token: str) -> bool:
+    """True for a bare ``?`` token; a quoted '?' is an ordinary string"""
+    return token == '?' and type(token) is str
+
+def _name(token: str) -> str:
+    """Intern an identifier token (sys.intern refuses str subclasses)"""
+    return sys.intern(str(token))
+
+# Memo of token -> token.upper(); cleared when it grows past _UP_CACHE_MAX
+_UP_CACHE: Dict[str, str] = {}
+_UP_CACHE_MAX = 4096
+
+def _up(s: str, _cache: Dict[str, str] = _UP_CACHE) -> str:
+    """Upper-case a token, reusing the result for tokens seen before"""
+    v = _cache.get(s)
+    if v is None:
+        if len(_cache) >= _UP_CACHE_MAX:
+            _cache.clear()
+        v = _cache[s] = s.upper()
+    return v
+
+@dataclass(slots=True)
+class Placeholder:
+    """A ``?`` parameter marker, bound positionally at execution time"""
+    index: int
+
+@dataclass(slots=True)
 class Column:
     name: str
     data_type: str
@@ -17,32 +55,49 @@ class Column:
     def __post_init__(self):
         if self.constraints is None:
             self.constraints = []
+    
+    def __setstate__(self, state):
+        # Slotted pickles carry (None, slots); files from before slots=True carry a dict
+        if isinstance(state, tuple):
+            state = state[1]
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
 
-@dataclass
+@dataclass(slots=True)
 class CreateTableStatement:
     table_name: str
     columns: List[Column]
 
-@dataclass
+@dataclass(slots=True)
 class InsertStatement:
     table_name: str
     columns: Optional[List[str]]
     values: List[Any]
+    param_count: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class SelectStatement:
     columns: List[str]  # ['*'] for all columns
     table_name: str
     where_clause: Optional[Dict[str, Any]] = None
     order_by: Optional[List[str]] = None
     limit: Optional[int] = None
+    param_count: int = 0
 
-@dataclass
+@dataclass(slots=True)
+class CountStatement:
+    """SELECT COUNT(*), answered from row counts without building rows"""
+    table_name: str
+    where_clause: Optional[Dict[str, Any]] = None
+    param_count: int = 0
+
+@dataclass(slots=True)
 class DeleteStatement:
     table_name: str
     where_clause: Optional[Dict[str, Any]] = None
+    param_count: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class DescribeStatement:
     table_name: str
 
@@ -50,85 +105,111 @@ class SQLParser:
     """SQL Parser implementing the Swapna (Dreaming) principle"""
     
     def __init__(self):
-        self.keywords = {
+        self.keywords = frozenset({
             'CREATE', 'TABLE', 'INSERT', 'INTO', 'VALUES', 'SELECT', 
             'FROM', 'WHERE', 'DELETE', 'ORDER', 'BY', 'LIMIT',
             'DESCRIBE', 'DESC',  # Add DESCRIBE commands
             'INTEGER', 'TEXT', 'REAL', 'BLOB', 'NULL'
+        })
+        
+        # Leading keyword -> sub-parser
+        self._dispatch = {
+            'CREATE': self._parse_create_table,
+            'INSERT': self._parse_insert,
+            'SELECT': self._parse_select,
+            'DELETE': self._parse_delete,
+            'DESCRIBE': self._parse_describe,
+            'DESC': self._parse_describe,
         }
     
-    def parse(self, sql: str) -> Union[CreateTableStatement, InsertStatement, SelectStatement, DeleteStatement, DescribeStatement]:
+    def parse(self, sql: str) -> Union[CreateTableStatement, InsertStatement, SelectStatement,
+                                       CountStatement, DeleteStatement, DescribeStatement]:
         """Parse SQL statement into AST"""
         sql = sql.strip().rstrip(';')
-        tokens = self._tokenize(sql)
-        
-        if not tokens:
+        if not sql:
             raise ParseError("Empty SQL statement")
         
-        statement_type = tokens[0].upper()
+        # Dispatch on the leading word so unsupported statements are rejected untokenized
+        end = 1
+        n = len(sql)
+        while end < n and sql[end] not in _DELIMITERS:
+            end += 1
+        statement_type = _up(sql[:end])
         
-        if statement_type == 'CREATE':
-            return self._parse_create_table(tokens)
-        elif statement_type == 'INSERT':
-            return self._parse_insert(tokens)
-        elif statement_type == 'SELECT':
-            return self._parse_select(tokens)
-        elif statement_type == 'DELETE':
-            return self._parse_delete(tokens)
-        elif statement_type in ['DESCRIBE', 'DESC']:
-            return self._parse_describe(tokens)
-        else:
+        handler = self._dispatch.get(statement_type)
+        if handler is None:
             raise ParseError(f"Unsupported statement type: {statement_type}")
+        
+        tokens = self._tokenize(sql)
+        # Upper-case once; sub-parsers look keywords up in this list
+        upper = [_up(tok) for tok in tokens]
+        return handler(tokens, upper)
     
     def _tokenize(self, sql: str) -> List[str]:
         """Tokenize SQL string preserving delimiters used by the parser.
 
         Splits on whitespace but keeps parentheses and commas as individual tokens.
         Quotes around string literals are stripped so downstream parsing can
-        treat them as a single token.
+        treat them as a single token; such tokens are returned as _Quoted.
         """
-        import re
-
-        pattern = r'(\(|\)|,|;|\s+)'
-        parts = re.split(pattern, sql)
-
         tokens: List[str] = []
-        for part in parts:
-            if part is None:
-                continue
-            part = part.strip()
-            if not part:
+        append = tokens.append
+        find = sql.find
+        i = 0
+        n = len(sql)
+        while i < n:
+            c = sql[i]
+            if c in _WHITESPACE:
+                i += 1
                 continue
-            if part == ';':
-                # statement terminator not needed by the AST
+            if c in '(),;':
+                if c != ';':
+                    # statement terminator not needed by the AST
+                    append(c)
+                i += 1
                 continue
-            # Handle quoted strings
-            if part.startswith("'") and part.endswith("'") and len(part) >= 2:
-                tokens.append(part[1:-1])
-            else:
-                tokens.append(part)
+            if c == "'":
+                end = find("'", i + 1)
+                if end != -1:
+                    append(_Quoted(sql[i + 1:end]))
+                    i = end + 1
+                    continue
+            # Bare word (an unterminated quote is read as one too)
+            start = i
+            i += 1
+            while i < n and sql[i] not in _DELIMITERS:
+                i += 1
+            append(sql[start:i])
 
         return tokens
     
-    def _parse_create_table(self, tokens: List[str]) -> CreateTableStatement:
+    @staticmethod
+    def _keyword_index(upper: List[str], keyword: str, start: int = 0) -> Optional[int]:
+        """Return position of the first occurrence of keyword at or after start, or None"""
+        try:
+            return upper.index(keyword, start)
+        except ValueError:
+            return None
+    
+    def _parse_create_table(self, tokens: List[str], upper: List[str]) -> CreateTableStatement:
         """Parse CREATE TABLE statement"""
-        if len(tokens) < 4 or tokens[1].upper() != 'TABLE':
+        if len(tokens) < 4 or upper[1] != 'TABLE':
             raise ParseError("Invalid CREATE TABLE syntax")
         
-        table_name = tokens[2]
+        table_name = _name(tokens[2])
         
         # Find column definitions between parentheses
         # Simplified parser - assumes format: CREATE TABLE name (col1 type1, col2 type2)
         try:
-            # Find parentheses bounds
-            paren_start = None
+            # Find parentheses bounds: first '(' and last ')' after it
+            paren_start = self._keyword_index(tokens, '(')
             paren_end = None
-            for i, tok in enumerate(tokens):
-                if tok == '(' and paren_start is None:
-                    paren_start = i
-                if tok == ')':
-                    paren_end = i
-            if paren_start is None or paren_end is None or paren_end <= paren_start:
+            if paren_start is not None:
+                for i in range(len(tokens) - 1, paren_start, -1):
+                    if tokens[i] == ')':
+                        paren_end = i
+                        break
+            if paren_end is None:
                 raise ParseError("Missing or invalid parentheses in CREATE TABLE")
 
             inner = tokens[paren_start + 1:paren_end]
@@ -155,8 +236,8 @@ class SQLParser:
             if len(parts) < 2:
                 buf = []
                 return
-            col_name = parts[0]
-            col_type = parts[1].upper()
+            col_name = _name(parts[0])
+            col_type = _up(parts[1])
             constraints = parts[2:] if len(parts) > 2 else []
             columns.append(Column(col_name, col_type, constraints))
             buf = []
@@ -170,72 +251,77 @@ class SQLParser:
 
         return columns
     
-    def _parse_insert(self, tokens: List[str]) -> InsertStatement:
+    def _parse_insert(self, tokens: List[str], upper: List[str]) -> InsertStatement:
         """Parse INSERT statement"""
-        if len(tokens) < 4 or tokens[1].upper() != 'INTO':
+        if len(tokens) < 4 or upper[1] != 'INTO':
             raise ParseError("Invalid INSERT syntax")
         
-        table_name = tokens[2]
+        table_name = _name(tokens[2])
         
-        # Find VALUES keyword
-        values_idx = None
-        for i, token in enumerate(tokens):
-            if token.upper() == 'VALUES':
-                values_idx = i
-                break
+        # Find VALUES keyword (after INSERT INTO name)
+        values_idx = self._keyword_index(upper, 'VALUES', 3)
         
         if values_idx is None:
             raise ParseError("Missing VALUES in INSERT statement")
         
-        # Extract values between parentheses and split by commas
-        tail = tokens[values_idx + 1:]
+        # Walk the value list in place: from '(' to its matching ')'
         try:
-            l = tail.index('(')
-            r = len(tail) - 1 - tail[::-1].index(')')
-            inner = tail[l + 1:r]
+            start = tokens.index('(', values_idx) + 1
         except ValueError:
-            inner = tail
+            start = values_idx + 1
 
         values: List[Any] = []
         buf: List[str] = []
+        param_count = 0
 
         def push_value(parts: List[str]):
+            nonlocal param_count
             if not parts:
                 return
-            token = ' '.join(parts)
-            if token.isdigit():
-                values.append(int(token))
+            token = parts[0] if len(parts) == 1 else ' '.join(parts)
+            if _is_param(token):
+                values.append(Placeholder(param_count))
+                param_count += 1
             else:
-                # float detection
-                try:
-                    if token.count('.') == 1 and all(p.isdigit() for p in token.split('.')):
-                        values.append(float(token))
-                    else:
-                        values.append(token)
-                except Exception:
-                    values.append(token)
+                values.append(self._coerce_literal(token))
 
-        for tok in inner:
-            if tok == ',':
+        depth = 0
+        for i in range(start, len(tokens)):
+            tok = tokens[i]
+            if tok == ',' and depth == 0:
                 push_value(buf)
                 buf = []
+            elif tok == ')' and depth == 0:
+                break
             else:
+                if tok == '(':
+                    depth += 1
+                elif tok == ')':
+                    depth -= 1
                 buf.append(tok)
         push_value(buf)
         
-        return InsertStatement(table_name, None, values)
+        return InsertStatement(table_name, None, values, param_count)
+    
+    @staticmethod
+    def _coerce_literal(token: str) -> Any:
+        """Convert a literal token to int or float when it is numeric"""
+        if token.isdecimal():
+            return int(token)
+        digits = token[1:] if token[:1] == '-' else token
+        if digits.isdecimal():
+            return int(token)
+        if digits.replace('.', '', 1).isdecimal():
+            return float(token)
+        return str(token)
     
-    def _parse_select(self, tokens: List[str]) -> SelectStatement:
+    def _parse_select(self, tokens: List[str], upper: List[str]) -> Union[SelectStatement, CountStatement]:
         """Parse SELECT statement"""
         if len(tokens) < 3:
             raise ParseError("Invalid SELECT syntax")
         
         # Find FROM keyword
-        from_idx = None
-        for i, token in enumerate(tokens):
-            if token.upper() == 'FROM':
-                from_idx = i
-                break
+        from_idx = self._keyword_index(upper, 'FROM')
         
         if from_idx is None:
             raise ParseError("Missing FROM in SELECT statement")
@@ -256,68 +342,96 @@ class SQLParser:
                     buf.append(tok)
             if buf:
                 cols.append(' '.join(buf))
-            columns = [c.strip() for c in cols if c.strip()]
+            columns = [sys.intern(c.strip()) for c in cols if c.strip()]
         
         # Extract table name
-        table_name = tokens[from_idx + 1]
+        table_name = _name(tokens[from_idx + 1])
         
         # Handle WHERE clause (simplified)
         where_clause = None
-        where_idx = None
-        for i, token in enumerate(tokens):
-            if token.upper() == 'WHERE':
-                where_idx = i
-                break
+        where_idx = self._keyword_index(upper, 'WHERE', from_idx + 2)
         
         if where_idx is not None and where_idx + 3 < len(tokens):
             # Simple WHERE clause: column = value
-            col = tokens[where_idx + 1]
+            col = _name(tokens[where_idx + 1])
             op = tokens[where_idx + 2]
             val = tokens[where_idx + 3]
             
             # Convert value
-            if val.isdigit():
-                val = int(val)
-            elif val.replace('.', '').isdigit():
-                val = float(val)
+            val = Placeholder(0) if _is_param(val) else self._coerce_literal(val)
             
             where_clause = {'column': col, 'operator': op, 'value': val}
         
-        return SelectStatement(columns, table_name, where_clause)
+        if upper[1:from_idx] == ['COUNT', '(', '*', ')']:
+            return CountStatement(table_name, where_clause,
+                                  self._where_param_count(where_clause))
+        return SelectStatement(columns, table_name, where_clause,
+                               param_count=self._where_param_count(where_clause))
     
-    def _parse_delete(self, tokens: List[str]) -> DeleteStatement:
+    def _parse_delete(self, tokens: List[str], upper: List[str]) -> DeleteStatement:
         """Parse DELETE statement"""
-        if len(tokens) < 3 or tokens[1].upper() != 'FROM':
+        if len(tokens) < 3 or upper[1] != 'FROM':
             raise ParseError("Invalid DELETE syntax")
         
-        table_name = tokens[2]
+        table_name = _name(tokens[2])
         
         # Handle WHERE clause (simplified)
         where_clause = None
-        where_idx = None
-        for i, token in enumerate(tokens):
-            if token.upper() == 'WHERE':
-                where_idx = i
-                break
+        where_idx = self._keyword_index(upper, 'WHERE', 3)
         
         if where_idx is not None and where_idx + 3 < len(tokens):
-            col = tokens[where_idx + 1]
+            col = _name(tokens[where_idx + 1])
             op = tokens[where_idx + 2] 
             val = tokens[where_idx + 3]
             
-            if val.isdigit():
-                val = int(val)
-            elif val.replace('.', '').isdigit():
-                val = float(val)
+            val = Placeholder(0) if _is_param(val) else self._coerce_literal(val)
             
             where_clause = {'column': col, 'operator': op, 'value': val}
         
-        return DeleteStatement(table_name, where_clause)
+        return DeleteStatement(table_name, where_clause,
+                               self._where_param_count(where_clause))
+    
+    @staticmethod
+    def parametrize(sql: str) -> Tuple[str, List[str]]:
+        """Replace string and number literals in sql with ``?``
+        
+        Returns the parametrized text and the literal tokens (quotes stripped,
+        as the lexer would leave them) in order of appearance.
+        """
+        literals: List[str] = []
+        append = literals.append
+        
+        def take(m) -> str:
+            quoted, number = m.groups()
+            append(number if quoted is None else quoted)
+            return '?'
+        
+        return _LITERAL_RE.sub(take, sql), literals
+    
+    def bind_literals(self, template, literals: List[str]):
+        """Fill a parsed template from parametrize() with its literal tokens
+        
+        Literals are coerced exactly as parse() would coerce them in place.
+        """
+        if type(template) is InsertStatement:
+            coerce = self._coerce_literal
+            values = [coerce(literals[v.index]) if type(v) is Placeholder else v
+                      for v in template.values]
+            return replace(template, values=values, param_count=0)
+        where = dict(template.where_clause, value=self._coerce_literal(literals[0]))
+        return replace(template, where_clause=where, param_count=0)
+    
+    @staticmethod
+    def _where_param_count(where_clause: Optional[Dict[str, Any]]) -> int:
+        """Number of ``?`` markers in a WHERE clause"""
+        if where_clause and isinstance(where_clause['value'], Placeholder):
+            return 1
+        return 0
     
-    def _parse_describe(self, tokens: List[str]) -> DescribeStatement:
+    def _parse_describe(self, tokens: List[str], upper: List[str]) -> DescribeStatement:
         """Parse DESCRIBE or DESC statement"""
         if len(tokens) < 2:
             raise ParseError("Invalid DESCRIBE syntax - missing table name")
         
-        table_name = tokens[1]
+        table_name = _name(tokens[1])
         return DescribeStatement(table_name)
@@ -1,19 +1,57 @@
 """
 Storage Engine - Jagrat (Waking State)
-Handles persistent data storage with B+ trees
+Handles persistent data storage in column lists with an append-only log
 """
 
 import os
 import pickle
 import struct
-from typing import List, Dict, Any, Optional, Tuple
+import sys
+import zlib
+from collections import defaultdict
+from bisect import bisect_left, bisect_right
+from itertools import compress, repeat
+from operator import eq, ne, lt, le, gt, ge, itemgetter, not_
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from .exceptions import StorageError
 from .parser import Column
 
+# Log record types (see StorageEngine for the file format)
+LOG_SNAPSHOT = 0
+LOG_CREATE = 1
+LOG_INSERT = 2
+LOG_DELETE = 3
+LOG_DELETE_ALL = 4
+
+# Maps a 0/1 deleted bitmap to a 1/0 live mask with bytes.translate
+_INVERT_BITS = bytes([1, 0]) + bytes(254)
+
+# Record header: type byte + payload length
+_LOG_HEADER = struct.Struct('<BI')
+_LOG_TYPES = frozenset({LOG_SNAPSHOT, LOG_CREATE, LOG_INSERT, LOG_DELETE, LOG_DELETE_ALL})
+
+# Files written before the log format are one pickle, which starts with PROTO
+_LEGACY_PICKLE_MAGIC = b'\x80'
+
+# WHERE operators mapped to their C-level comparison functions
+COMPARE_OPS = {'=': eq, '!=': ne, '<': lt, '<=': le, '>': gt, '>=': ge}
+
+def scan_column(values: List[Any], op_fn, value: Any, deleted: Optional[bytearray]) -> List[int]:
+    """Return positions i where op_fn(values[i], value) holds and row i is live
+    
+    Shared by Table and the cache layer's InMemoryTable. map/compress run
+    the per-element loop in C, so a scan costs one comparison call per row
+    with no Python bytecode in between.
+    """
+    hits = compress(range(len(values)), map(op_fn, values, repeat(value)))
+    if deleted is not None:
+        return [i for i in hits if not deleted[i]]
+    return list(hits)
+
 class BTreeNode:
     """B+ tree node for efficient data storage and retrieval"""
     
-    def __init__(self, is_leaf=False, order=4):
+    def __init__(self, is_leaf=False, order=128):
         self.is_leaf = is_leaf
         self.keys = []
         self.values = []  # Only used in leaf nodes
@@ -26,9 +64,7 @@ class BTreeNode:
     
     def insert_key(self, key, value=None):
         """Insert key-value pair maintaining sorted order"""
-        pos = 0
-        while pos < len(self.keys) and self.keys[pos] < key:
-            pos += 1
+        pos = bisect_right(self.keys, key)
         
         self.keys.insert(pos, key)
         if self.is_leaf:
@@ -60,9 +96,14 @@ class BTreeNode:
             return promoted_key, new_node
 
 class BTree:
-    """B+ tree implementation for table storage"""
+    """B+ tree implementation for table storage
     
-    def __init__(self, order=4):
+    Tables no longer keep one. It is kept only so old database files,
+    which pickled each table's rows into a BTree, still load and migrate.
+    """
+    
+    def __init__(self, order=128):
+        # Wide nodes keep the tree shallow; bisect makes in-node search cheap
         self.root = BTreeNode(is_leaf=True, order=order)
         self.order = order
     
@@ -77,22 +118,22 @@ class BTree:
         self._insert_non_full(self.root, key, value)
     
     def _insert_non_full(self, node, key, value):
-        """Insert into a non-full node"""
-        if node.is_leaf:
-            node.insert_key(key, value)
-        else:
-            # Find child to insert into
-            i = len(node.keys) - 1
-            while i >= 0 and key < node.keys[i]:
-                i -= 1
-            i += 1
+        """Insert into a non-full node, splitting full children on the way down"""
+        max_keys = self.order - 1
+        while not node.is_leaf:
+            # Find child to insert into; keys equal to a separator live on its right
+            keys = node.keys
+            children = node.children
+            i = bisect_right(keys, key)
             
-            if node.children[i].is_full():
+            if len(children[i].keys) >= max_keys:
                 self._split_child(node, i)
-                if key > node.keys[i]:
+                if key >= keys[i]:
                     i += 1
             
-            self._insert_non_full(node.children[i], key, value)
+            node = children[i]
+        
+        node.insert_key(key, value)
     
     def _split_child(self, parent, index):
         """Split a full child node"""
@@ -108,32 +149,50 @@ class BTree:
     
     def _search_node(self, node, key):
         """Search for key starting from given node"""
-        if node.is_leaf:
-            for i, k in enumerate(node.keys):
-                if k == key:
-                    return node.values[i]
-            return None
-        else:
-            i = 0
-            while i < len(node.keys) and key > node.keys[i]:
-                i += 1
-            return self._search_node(node.children[i], key)
+        bisect = bisect_right
+        while not node.is_leaf:
+            node = node.children[bisect(node.keys, key)]
+        
+        keys = node.keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return node.values[i]
+        return None
     
     def range_query(self, start_key=None, end_key=None):
-        """Perform range query returning all values in range"""
-        results = []
-        leaf = self._find_leftmost_leaf()
+        """Yield (key, value) pairs with start_key <= key <= end_key in key order"""
+        if start_key is None:
+            leaf = self._find_leftmost_leaf()
+            lo = 0
+        else:
+            leaf = self._find_leaf(start_key)
+            lo = bisect_left(leaf.keys, start_key)
+        
+        if end_key is None:
+            # Unbounded above: take whole leaves
+            while leaf:
+                keys = leaf.keys
+                yield from (zip(keys[lo:], leaf.values[lo:]) if lo else zip(keys, leaf.values))
+                lo = 0
+                leaf = leaf.next_leaf
+            return
         
         while leaf:
-            for i, key in enumerate(leaf.keys):
-                if start_key is not None and key < start_key:
-                    continue
-                if end_key is not None and key > end_key:
-                    return results
-                results.append((key, leaf.values[i]))
+            keys = leaf.keys
+            hi = bisect_right(keys, end_key)
+            yield from zip(keys[lo:hi], leaf.values[lo:hi])
+            if hi < len(keys):
+                return
+            lo = 0
             leaf = leaf.next_leaf
-        
-        return results
+    
+    def _find_leaf(self, key):
+        """Find the leftmost leaf that may hold key"""
+        node = self.root
+        bisect = bisect_left
+        while not node.is_leaf:
+            node = node.children[bisect(node.keys, key)]
+        return node
     
     def _find_leftmost_leaf(self):
         """Find the leftmost leaf node"""
@@ -143,113 +202,244 @@ class BTree:
         return node
 
 class Table:
-    """Represents a database table with its schema and data"""
+    """Represents a database table with its schema and data
+    
+    Rows are stored column-wise: one list per column, indexed by slot, plus
+    a deleted bitmap. Row dicts are only built when rows leave the table.
+    """
     
     def __init__(self, name: str, columns: List[Column]):
-        self.name = name
+        # Interned names make row-dict and column lookups hit the identity fast path
+        self.name = sys.intern(name)
         self.columns = columns
-        self.column_names = [col.name for col in columns]
-        self.column_types = {col.name: col.data_type for col in columns}
+        self.column_names = [sys.intern(col.name) for col in columns]
+        self.column_types = dict(zip(self.column_names, [col.data_type for col in columns]))
+        
+        # Column-oriented storage (slot -> value per column) and deleted bitmap
+        self.columns_data: Dict[str, List[Any]] = {name: [] for name in self.column_names}
+        self._column_lists = [self.columns_data[name] for name in self.column_names]
+        self.deleted = bytearray()
         
-        # B+ tree for primary storage (using row_id as key)
-        self.data_tree = BTree()
+        # Row ID per slot; IDs only grow, so the list stays sorted through compaction
+        self.row_ids: List[int] = []
         self.next_row_id = 1
         
-        # Indexes for fast lookups (simplified - one per column)
+        # Equality indexes, one per column (value -> slots holding it)
+        self.indexes: Dict[str, Dict[Any, List[int]]] = {name: {} for name in self.column_names}
+        self._index_list = [self.indexes[name] for name in self.column_names]
+        
+        # Pending log records, attached by the StorageEngine that owns the table
+        self.journal: Optional[List[Tuple]] = None
+    
+    def __getstate__(self):
+        # Indexes are derived from the columns; rebuild them on load
+        state = self.__dict__.copy()
+        for key in ('_column_lists', 'indexes', '_index_list', 'journal'):
+            del state[key]
+        return state
+    
+    def __setstate__(self, state):
+        if 'columns_data' not in state:
+            state = self._legacy_state(state)
+        self.__dict__.update(state)
+        if 'row_ids' not in state:
+            # Snapshots from before row IDs were stored numbered slots from 1
+            self.row_ids = list(range(1, len(self.deleted) + 1))
+        # Unpickled strings are not interned; re-intern names as __init__ does
+        self.name = sys.intern(self.name)
+        self.column_names = [sys.intern(name) for name in self.column_names]
+        self.column_types = dict(zip(self.column_names, self.column_types.values()))
+        self.columns_data = dict(zip(self.column_names, self.columns_data.values()))
+        self._column_lists = [self.columns_data[name] for name in self.column_names]
+        self.journal = None
+        self._rebuild_derived()
+    
+    @staticmethod
+    def _legacy_state(state: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a Table pickled with row dicts in its B+ tree to column state"""
+        names = state['column_names']
+        column_lists = [[] for _ in names]
+        row_ids = []
+        for row_id, row in state['data_tree'].range_query():
+            if row.get('__deleted__'):
+                continue
+            row_ids.append(row_id)
+            for column_list, name in zip(column_lists, names):
+                column_list.append(row.get(name))
+        live_count = len(column_lists[0]) if column_lists else 0
+        return {
+            'name': state['name'],
+            'columns': state['columns'],
+            'column_names': names,
+            'column_types': state['column_types'],
+            'columns_data': dict(zip(names, column_lists)),
+            'deleted': bytearray(live_count),
+            'row_ids': row_ids,
+            'next_row_id': state['next_row_id'],
+        }
+    
+    def _rebuild_derived(self):
+        """Rebuild the indexes from the column lists"""
         self.indexes = {}
+        for col_name, values in self.columns_data.items():
+            index = self.indexes[col_name] = defaultdict(list)
+            for slot, value in enumerate(values):
+                index[value].append(slot)
+        self._index_list = [self.indexes[name] for name in self.column_names]
     
     def insert_row(self, values: List[Any]) -> int:
         """Insert a row and return the row ID"""
         if len(values) != len(self.columns):
             raise StorageError(f"Expected {len(self.columns)} values, got {len(values)}")
         
-        # Create row dictionary
-        row = dict(zip(self.column_names, values))
+        if self.journal is not None:
+            self.journal.append((LOG_INSERT, self.name, tuple(values)))
+        
         row_id = self.next_row_id
         self.next_row_id += 1
         
-        # Store in main B+ tree
-        self.data_tree.insert(row_id, row)
+        # Append to each column
+        slot = len(self.deleted)
+        for column_list, value in zip(self._column_lists, values):
+            column_list.append(value)
+        self.deleted.append(0)
+        self.row_ids.append(row_id)
         
         # Update indexes
-        for col_name, value in row.items():
-            if col_name not in self.indexes:
-                self.indexes[col_name] = BTree()
-            self.indexes[col_name].insert(value, row_id)
+        for index, value in zip(self._index_list, values):
+            index.setdefault(value, []).append(slot)
         
         return row_id
     
+    def row_count(self) -> int:
+        """Number of stored rows, including rows marked deleted"""
+        return len(self.deleted)
+    
+    def _row_at(self, slot: int) -> Dict[str, Any]:
+        """Materialize the row stored at slot as a dict"""
+        return dict(zip(self.column_names, [col[slot] for col in self._column_lists]))
+    
+    def _live_values(self) -> Iterator[Tuple]:
+        """Iterate value tuples of live rows in slot order"""
+        rows = zip(*self._column_lists)
+        if 1 in self.deleted:
+            rows = compress(rows, map(not_, self.deleted))
+        return rows
+    
+    def live_columns(self) -> Dict[str, List[Any]]:
+        """Copy of each column holding only live rows"""
+        if 1 not in self.deleted:
+            return {name: list(values) for name, values in self.columns_data.items()}
+        live = self.deleted.translate(_INVERT_BITS)
+        return {name: list(compress(values, live)) for name, values in self.columns_data.items()}
+    
     def select_all(self) -> List[Dict[str, Any]]:
-        """Select all rows from table"""
-        results = []
-        for key, row in self.data_tree.range_query():
-            results.append(row)
-        return results
+        """Select all live rows from table"""
+        names = self.column_names
+        return [dict(zip(names, values)) for values in self._live_values()]
+    
+    def _rows_at(self, slots: List[int]) -> List[Dict[str, Any]]:
+        """Materialize the rows at the given slots, gathering each column once"""
+        if len(slots) < 2:
+            return [self._row_at(slot) for slot in slots]
+        gather = itemgetter(*slots)
+        names = self.column_names
+        return [dict(zip(names, values))
+                for values in zip(*[gather(col) for col in self._column_lists])]
     
     def select_where(self, column: str, operator: str, value: Any) -> List[Dict[str, Any]]:
         """Select rows matching WHERE clause"""
-        results = []
-        
-        if operator == '=' and column in self.indexes:
-            # Use index for exact match
-            row_id = self.indexes[column].search(value)
-            if row_id:
-                row = self.data_tree.search(row_id)
-                if row:
-                    results.append(row)
+        return self._rows_at(self._where_slots(column, operator, value))
+    
+    def count(self, where: Optional[Dict[str, Any]] = None) -> int:
+        """Count live rows, optionally only those matching a where clause"""
+        if where is None:
+            return len(self.deleted) - self.deleted.count(1)
+        return len(self._where_slots(where['column'], where['operator'], where['value']))
+    
+    def _where_slots(self, column: str, operator: str, value: Any) -> List[int]:
+        """Slots of live rows matching WHERE clause"""
+        if operator == '=':
+            # Use index for exact match; it holds every slot with this value
+            index = self.indexes.get(column)
+            slots = index.get(value, ()) if index is not None else ()
+            if slots and 1 in self.deleted:
+                deleted = self.deleted
+                slots = [slot for slot in slots if not deleted[slot]]
         else:
-            # Full table scan
-            for key, row in self.data_tree.range_query():
-                if self._evaluate_condition(row, column, operator, value):
-                    results.append(row)
+            # Full column scan
+            slots = self._scan_slots(column, operator, value)
         
-        return results
+        return slots
     
     def delete_where(self, column: str, operator: str, value: Any) -> int:
         """Delete rows matching WHERE clause, return count"""
-        # For simplicity, we'll mark rows as deleted rather than actually removing them
-        # In a full implementation, we'd need proper deletion with tree rebalancing
-        deleted_count = 0
-        
-        for key, row in self.data_tree.range_query():
-            if self._evaluate_condition(row, column, operator, value):
-                # Mark as deleted (simplified approach)
-                row['__deleted__'] = True
-                deleted_count += 1
+        if self.journal is not None:
+            self.journal.append((LOG_DELETE, self.name, column, operator, value))
         
+        # Rows are flagged in the deleted bitmap and dropped once they are the majority
+        slots = self._scan_slots(column, operator, value)
+        deleted = self.deleted
+        for slot in slots:
+            deleted[slot] = 1
+        if slots and deleted.count(1) * 2 > len(deleted):
+            self._compact()
+        return len(slots)
+    
+    def delete_all(self) -> int:
+        """Delete every row, return count"""
+        if self.journal is not None:
+            self.journal.append((LOG_DELETE_ALL, self.name))
+        deleted_count = len(self.deleted) - self.deleted.count(1)
+        self.deleted = bytearray(b'\x01' * len(self.deleted))
+        self._compact()
         return deleted_count
     
-    def _evaluate_condition(self, row: Dict[str, Any], column: str, operator: str, value: Any) -> bool:
-        """Evaluate WHERE condition against a row"""
-        if '__deleted__' in row and row['__deleted__']:
-            return False
-            
-        if column not in row:
-            return False
+    def _compact(self):
+        """Physically drop deleted rows so scans cost live rows only
         
-        row_value = row[column]
-        
-        if operator == '=':
-            return row_value == value
-        elif operator == '!=':
-            return row_value != value
-        elif operator == '<':
-            return row_value < value
-        elif operator == '<=':
-            return row_value <= value
-        elif operator == '>':
-            return row_value > value
-        elif operator == '>=':
-            return row_value >= value
-        else:
-            return False
+        Survivors keep their row IDs and next_row_id is untouched, so IDs
+        are never reused; replaying the log compacts identically.
+        """
+        live = self.deleted.translate(_INVERT_BITS)
+        for column_list in self._column_lists:
+            column_list[:] = compress(column_list, live)
+        self.row_ids[:] = compress(self.row_ids, live)
+        self.deleted = bytearray(len(self.row_ids))
+        self._rebuild_derived()
+    
+    def _scan_slots(self, column: str, operator: str, value: Any) -> List[int]:
+        """Slots of live rows whose column value satisfies the condition"""
+        values = self.columns_data.get(column)
+        op_fn = COMPARE_OPS.get(operator)
+        if values is None or op_fn is None:
+            return []
+        return scan_column(values, op_fn, value, self.deleted if 1 in self.deleted else None)
 
 class StorageEngine:
-    """Storage engine implementing the Jagrat (Waking) principle"""
+    """Storage engine implementing the Jagrat (Waking) principle
+    
+    The database file is an append-only log of length-prefixed records:
+    an optional snapshot of all tables followed by CREATE/INSERT/DELETE
+    operations. commit() appends the pending operations; once enough have
+    accumulated the file is rewritten as a single snapshot. A record torn
+    by a crash mid-write is cut off the end of the file when it is next
+    opened, before anything else is appended.
+    Files from before the log format (one pickle of all tables) are
+    migrated to a snapshot when opened.
+    
+    With no database_path the engine is purely in memory: nothing is
+    logged and commit() does nothing.
+    """
     
-    def __init__(self, database_path: str):
+    # Logged operations replayed on load before the file is compacted
+    CHECKPOINT_RECORDS = 10000
+    
+    def __init__(self, database_path: Optional[str]):
         self.database_path = database_path
         self.tables = {}
+        self._journal: Optional[List[Tuple]] = [] if database_path is not None else None
+        self._log_records = 0
         self._load_database()
     
     def create_table(self, name: str, columns: List[Column]):
@@ -257,8 +447,11 @@ class StorageEngine:
         if name in self.tables:
             raise StorageError(f"Table {name} already exists")
         
-        self.tables[name] = Table(name, columns)
-        self._save_database()
+        table = Table(name, columns)
+        table.journal = self._journal
+        self.tables[name] = table
+        if self._journal is not None:
+            self._journal.append((LOG_CREATE, name, columns))
     
     def get_table(self, name: str) -> Optional[Table]:
         """Get table by name"""
@@ -270,28 +463,112 @@ class StorageEngine:
     
     def _load_database(self):
         """Load database from disk if a valid non-empty file exists."""
+        self.tables = {}
+        if self.database_path is None:
+            return
         if os.path.exists(self.database_path) and os.path.getsize(self.database_path) > 0:
             try:
                 with open(self.database_path, 'rb') as f:
-                    self.tables = pickle.load(f)
+                    data = f.read()
+                legacy = data[:1] == _LEGACY_PICKLE_MAGIC
+                if legacy:
+                    tables = pickle.loads(data)
+                    self.tables = {table.name: table for table in tables.values()}
+                else:
+                    end = self._replay_log(data)
+                    if end < len(data):
+                        # Drop a torn tail so the next append starts on a record boundary
+                        os.truncate(self.database_path, end)
             except Exception as e:
                 raise StorageError(f"Failed to load database: {e}")
-        else:
-            self.tables = {}
+            if legacy:
+                # Rewrite the old whole-file pickle as a snapshot record
+                self._save_database()
+        for table in self.tables.values():
+            table.journal = self._journal
+    
+    def _replay_log(self, data: bytes) -> int:
+        """Rebuild self.tables from the records in data
+        
+        Returns the offset just past the last complete record; anything
+        after it is a torn write.
+        """
+        header_size = _LOG_HEADER.size
+        pos = 0
+        while pos + header_size <= len(data):
+            record_type, length = _LOG_HEADER.unpack_from(data, pos)
+            pos += header_size
+            if record_type not in _LOG_TYPES:
+                raise StorageError(f"Unknown log record type {record_type} at offset {pos - header_size}")
+            if pos + length > len(data):
+                # Torn write at the tail; everything before it is intact
+                return pos - header_size
+            payload = data[pos:pos + length]
+            pos += length
+            
+            if record_type == LOG_SNAPSHOT:
+                tables = pickle.loads(zlib.decompress(payload))
+                self.tables = {table.name: table for table in tables.values()}
+                self._log_records = 0
+                continue
+            
+            record = pickle.loads(payload)
+            self._log_records += 1
+            if record_type == LOG_CREATE:
+                self.tables[record[0]] = Table(record[0], record[1])
+            elif record_type == LOG_INSERT:
+                self.tables[record[0]].insert_row(record[1])
+            elif record_type == LOG_DELETE:
+                self.tables[record[0]].delete_where(*record[1:])
+            else:
+                self.tables[record[0]].delete_all()
+        return pos
+    
+    def _append_log(self, records: List[Tuple]):
+        """Append records to the database file in one write"""
+        dumps = pickle.dumps
+        pack = _LOG_HEADER.pack
+        chunks = []
+        for record in records:
+            payload = dumps(record[1:], pickle.HIGHEST_PROTOCOL)
+            chunks.append(pack(record[0], len(payload)))
+            chunks.append(payload)
+        try:
+            self._ensure_directory()
+            with open(self.database_path, 'ab') as f:
+                f.write(b''.join(chunks))
+        except Exception as e:
+            raise StorageError(f"Failed to save database: {e}")
+        self._log_records += len(records)
     
     def _save_database(self):
-        """Save database to disk"""
+        """Rewrite the database file as a single snapshot record"""
         try:
-            # Ensure directory exists
-            dir_path = os.path.dirname(self.database_path)
-            if dir_path and not os.path.exists(dir_path):
-                os.makedirs(dir_path, exist_ok=True)
-            
-            with open(self.database_path, 'wb') as f:
-                pickle.dump(self.tables, f)
+            self._ensure_directory()
+            # Column lists repeat values heavily; a fast zlib level shrinks them well
+            payload = zlib.compress(pickle.dumps(self.tables, pickle.HIGHEST_PROTOCOL), 1)
+            tmp_path = self.database_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(_LOG_HEADER.pack(LOG_SNAPSHOT, len(payload)))
+                f.write(payload)
+            os.replace(tmp_path, self.database_path)
         except Exception as e:
             raise StorageError(f"Failed to save database: {e}")
+        self._log_records = 0
+    
+    def _ensure_directory(self):
+        dir_path = os.path.dirname(self.database_path)
+        if dir_path and not os.path.exists(dir_path):
+            os.makedirs(dir_path, exist_ok=True)
     
     def commit(self):
-        """Persist changes to disk"""
-        self._save_database()
+        """Persist changes to disk
+        
+        Table changes are only durable once committed; with nothing pending
+        this does no I/O.
+        """
+        if self._journal:
+            self._append_log(self._journal)
+            self._journal.clear()
+        if self._log_records >= self.CHECKPOINT_RECORDS:
+            self._save_database()
@@ -10,6 +10,106 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.mandukya_db import MandukyaDB
+from src.exceptions import MandukyaError
+
+# Simulated session, replayed in order as (command, description)
+_COMMANDS = (
+    # DDL Commands
+    ("CREATE TABLE employees (id INTEGER, name TEXT, department TEXT, salary INTEGER);", "Create employees table"),
+    ("CREATE TABLE projects (proj_id INTEGER, name TEXT, budget INTEGER);", "Create projects table"),
+    
+    # Show schema
+    (".tables", "List all tables"),
+    (".schema", "Show database schema"),
+    
+    # DML Commands - Insert data
+    ("INSERT INTO employees VALUES (1, 'Arjuna', 'Engineering', 95000);", "Insert employee 1"),
+    ("INSERT INTO employees VALUES (2, 'Krishna', 'Management', 120000);", "Insert employee 2"), 
+    ("INSERT INTO employees VALUES (3, 'Bhima', 'Sales', 75000);", "Insert employee 3"),
+    ("INSERT INTO employees VALUES (4, 'Draupadi', 'HR', 85000);", "Insert employee 4"),
+    
+    ("INSERT INTO projects VALUES (1, 'Database Project', 500000);", "Insert project 1"),
+    ("INSERT INTO projects VALUES (2, 'Web App', 300000);", "Insert project 2"),
+    
+    # Query data
+    ("SELECT * FROM employees;", "Select all employees"),
+    ("SELECT name, salary FROM employees WHERE salary > 80000;", "High-salary employees"),
+    ("SELECT department FROM employees WHERE name = 'Krishna';", "Krishna's department"),
+    ("SELECT * FROM projects WHERE budget > 400000;", "Large projects"),
+    
+    # Statistics and info
+    (".stats", "Database statistics"),
+    (".sample employees", "Sample employee data"),
+    
+    # Delete operation
+    ("DELETE FROM employees WHERE salary < 80000;", "Delete low-salary employees"),
+    ("SELECT * FROM employees;", "Verify deletion"),
+)
+
+def _do_tables(db, command):
+    tables = db.get_tables()
+    if tables:
+        print(f"    Result: Tables: {', '.join(tables)}")
+    else:
+        print(f"    Result: No tables found")
+
+def _do_schema(db, command):
+    tables = db.get_tables()
+    print(f"    Result: Database has {len(tables)} tables")
+    for table_name in tables:
+        table = db.engine.storage.get_table(table_name)
+        if table:
+            cols = [f"{col.name}({col.data_type})" for col in table.columns]
+            print(f"            {table_name}: {', '.join(cols)}")
+
+def _do_stats(db, command):
+    stats = db.get_stats()
+    exec_stats = stats['execution_stats']
+    cache_stats = stats['cache_stats']
+    print(f"    Result: Queries: {exec_stats['queries_executed']}, Cache: {cache_stats['hit_rate']}")
+
+def _do_sample(db, command):
+    table_name = command.split()[1]
+    try:
+        results = db.execute(f"SELECT * FROM {table_name}")
+    except MandukyaError as e:
+        print(f"    ❌ Error: {e}")
+        return
+    print(f"    Result: {len(results)} rows in {table_name}")
+    if results:  # Show first 3 rows
+        print("\n".join(f"            {row}" for row in results[:3]))
+
+def _do_sql(db, command):
+    try:
+        result = db.execute(command)
+    except MandukyaError as e:
+        print(f"    ❌ Error: {e}")
+        return
+    
+    if isinstance(result, list):
+        print(f"    Result: {len(result)} rows returned")
+        if len(result) <= 5:  # Show all if 5 or fewer
+            shown = [f"            {row}" for row in result]
+        else:  # Show first 3 and last 1
+            shown = [f"            {row}" for row in result[:3]]
+            shown.append(f"            ... ({len(result)-4} more rows)")
+            shown.append(f"            {result[-1]}")
+        if shown:
+            print("\n".join(shown))
+    elif isinstance(result, int):
+        if 'INSERT' in command:
+            print(f"    Result: Inserted row with ID: {result}")
+        elif 'DELETE' in command:
+            print(f"    Result: Deleted {result} row(s)")
+    else:
+        print(f"    Result: {result}")
+
+_DOT_COMMANDS = {
+    '.tables': _do_tables,
+    '.schema': _do_schema,
+    '.stats': _do_stats,
+    '.sample': _do_sample,
+}
 
 def test_interactive_session():
     """Simulate an interactive CLI session"""
@@ -24,99 +124,13 @@ def test_interactive_session():
     print("✅ Connected to database: test_database.db")
     print()
     
-    commands = [
-        # DDL Commands
-        ("CREATE TABLE employees (id INTEGER, name TEXT, department TEXT, salary INTEGER);", "Create employees table"),
-        ("CREATE TABLE projects (proj_id INTEGER, name TEXT, budget INTEGER);", "Create projects table"),
-        
-        # Show schema
-        (".tables", "List all tables"),
-        (".schema", "Show database schema"),
-        
-        # DML Commands - Insert data
-        ("INSERT INTO employees VALUES (1, 'Arjuna', 'Engineering', 95000);", "Insert employee 1"),
-        ("INSERT INTO employees VALUES (2, 'Krishna', 'Management', 120000);", "Insert employee 2"), 
-        ("INSERT INTO employees VALUES (3, 'Bhima', 'Sales', 75000);", "Insert employee 3"),
-        ("INSERT INTO employees VALUES (4, 'Draupadi', 'HR', 85000);", "Insert employee 4"),
-        
-        ("INSERT INTO projects VALUES (1, 'Database Project', 500000);", "Insert project 1"),
-        ("INSERT INTO projects VALUES (2, 'Web App', 300000);", "Insert project 2"),
-        
-        # Query data
-        ("SELECT * FROM employees;", "Select all employees"),
-        ("SELECT name, salary FROM employees WHERE salary > 80000;", "High-salary employees"),
-        ("SELECT department FROM employees WHERE name = 'Krishna';", "Krishna's department"),
-        ("SELECT * FROM projects WHERE budget > 400000;", "Large projects"),
-        
-        # Statistics and info
-        (".stats", "Database statistics"),
-        (".sample employees", "Sample employee data"),
-        
-        # Delete operation
-        ("DELETE FROM employees WHERE salary < 80000;", "Delete low-salary employees"),
-        ("SELECT * FROM employees;", "Verify deletion"),
-    ]
-    
-    for i, (command, description) in enumerate(commands, 1):
+    for i, (command, description) in enumerate(_COMMANDS, 1):
         print(f"{i:2d}. {description}")
         print(f"    Command: {command}")
         
-        try:
-            if command.startswith('.'):
-                # Handle CLI commands
-                if command == '.tables':
-                    tables = db.get_tables()
-                    if tables:
-                        print(f"    Result: Tables: {', '.join(tables)}")
-                    else:
-                        print(f"    Result: No tables found")
-                        
-                elif command == '.schema':
-                    tables = db.get_tables()
-                    print(f"    Result: Database has {len(tables)} tables")
-                    for table_name in tables:
-                        table = db.engine.storage.get_table(table_name)
-                        if table:
-                            cols = [f"{col.name}({col.data_type})" for col in table.columns]
-                            print(f"            {table_name}: {', '.join(cols)}")
-                            
-                elif command == '.stats':
-                    stats = db.get_stats()
-                    exec_stats = stats['execution_stats']
-                    cache_stats = stats['cache_stats']
-                    print(f"    Result: Queries: {exec_stats['queries_executed']}, Cache: {cache_stats['hit_rate']}")
-                    
-                elif command.startswith('.sample'):
-                    table_name = command.split()[1]
-                    results = db.execute(f"SELECT * FROM {table_name}")
-                    print(f"    Result: {len(results)} rows in {table_name}")
-                    for row in results[:3]:  # Show first 3 rows
-                        print(f"            {row}")
-                        
-            else:
-                # Handle SQL commands
-                result = db.execute(command)
-                
-                if isinstance(result, list):
-                    print(f"    Result: {len(result)} rows returned")
-                    if len(result) <= 5:  # Show all if 5 or fewer
-                        for row in result:
-                            print(f"            {row}")
-                    else:  # Show first 3 and last 1
-                        for row in result[:3]:
-                            print(f"            {row}")
-                        print(f"            ... ({len(result)-4} more rows)")
-                        print(f"            {result[-1]}")
-                elif isinstance(result, int):
-                    if 'INSERT' in command:
-                        print(f"    Result: Inserted row with ID: {result}")
-                    elif 'DELETE' in command:
-                        print(f"    Result: Deleted {result} row(s)")
-                else:
-                    print(f"    Result: {result}")
-                    
-        except Exception as e:
-            print(f"    ❌ Error: {e}")
+        # Dot commands dispatch on their first word; anything else is SQL
+        handler = _DOT_COMMANDS.get(command.partition(' ')[0], _do_sql)
+        handler(db, command)
         
         print()
     
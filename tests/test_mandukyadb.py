@@ -8,20 +8,27 @@ import os
 import unittest
 import tempfile
 import shutil
+import copyreg
+import pickle
 
 # Add src to path for importing
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.mandukya_db import MandukyaDB
-from src.exceptions import MandukyaError, ParseError
+from src.exceptions import MandukyaError, ParseError, StorageError
 from src.parser import SQLParser, Column
-from src.storage import BTree, StorageEngine
+from src.storage import BTree, StorageEngine, Table
+
+# Rows for the bulk-insert benchmark, built once per test run
+_BULK_ROWS = tuple((i, i*2) for i in range(1000))
 
 class TestSQLParser(unittest.TestCase):
     """Test SQL parser functionality"""
     
-    def setUp(self):
-        self.parser = SQLParser()
+    @classmethod
+    def setUpClass(cls):
+        # SQLParser keeps no per-statement state, so one instance serves every test
+        cls.parser = SQLParser()
     
     def test_create_table_parsing(self):
         """Test CREATE TABLE statement parsing"""
@@ -72,6 +79,31 @@ class TestSQLParser(unittest.TestCase):
         self.assertEqual(stmt.table_name, "students")
         self.assertEqual(stmt.where_clause['column'], "id")
 
+    def test_parametrized_template(self):
+        """Test that binding literals into a template matches a direct parse"""
+        for sql in ["INSERT INTO students VALUES (7, 'Bhima', 2.5)",
+                    "SELECT name FROM students WHERE name = 'Arjuna'",
+                    "DELETE FROM students WHERE id = 12"]:
+            shape, literals = self.parser.parametrize(sql)
+            template = self.parser.parse(shape)
+            self.assertEqual(template.param_count, len(literals))
+            self.assertEqual(self.parser.bind_literals(template, literals), self.parser.parse(sql))
+    
+    def test_quoted_question_mark(self):
+        """Test that only a bare ? is a parameter, not the string '?'"""
+        stmt = self.parser.parse("INSERT INTO t VALUES (?, '?')")
+        self.assertEqual(stmt.param_count, 1)
+        self.assertEqual(stmt.values[1], '?')
+        self.assertIs(type(stmt.values[1]), str)
+        stmt = self.parser.parse("SELECT * FROM t WHERE a = '?'")
+        self.assertEqual((stmt.param_count, stmt.where_clause['value']), (0, '?'))
+    
+    def test_where_literal_coercion(self):
+        """Test that WHERE literals are coerced like INSERT values"""
+        self.assertEqual(self.parser.parse("SELECT * FROM t WHERE a > -5").where_clause['value'], -5)
+        self.assertEqual(self.parser.parse("SELECT * FROM t WHERE a = 2.5").where_clause['value'], 2.5)
+        self.assertEqual(self.parser.parse("SELECT * FROM t WHERE a = 1.2.3").where_clause['value'], '1.2.3')
+
 class TestBTree(unittest.TestCase):
     """Test B+ tree implementation"""
     
@@ -116,14 +148,11 @@ class TestMandukyaDB(unittest.TestCase):
     
     def setUp(self):
         """Set up test database"""
-        self.test_dir = tempfile.mkdtemp()
-        self.db_path = os.path.join(self.test_dir, "test.db")
-        self.db = MandukyaDB(self.db_path)
+        self.db = MandukyaDB(":memory:")
     
     def tearDown(self):
         """Clean up test database"""
         self.db.close()
-        shutil.rmtree(self.test_dir)
     
     def test_create_table(self):
         """Test table creation"""
@@ -163,6 +192,18 @@ class TestMandukyaDB(unittest.TestCase):
         # Test greater than  
         results = self.db.execute("SELECT * FROM numbers WHERE value > 15;")
         self.assertEqual(len(results), 2)
+
+    def test_where_equals_duplicates(self):
+        """Test that equality lookups return every row with the value"""
+        self.db.execute("CREATE TABLE tags (id INTEGER, tag TEXT);")
+        for i, tag in enumerate(['a', 'b', 'a', 'c', 'a']):
+            self.db.execute(f"INSERT INTO tags VALUES ({i}, '{tag}');")
+        self.db.execute("DELETE FROM tags WHERE id = 2;")
+
+        table = self.db.engine.storage.get_table("tags")
+        self.assertEqual([row['id'] for row in table.select_where('tag', '=', 'a')], [0, 4])
+        results = self.db.execute("SELECT id FROM tags WHERE tag = 'a';")
+        self.assertEqual(results, [(0,), (4,)])
     
     def test_delete(self):
         """Test delete operations"""
@@ -180,6 +221,30 @@ class TestMandukyaDB(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0][1], "item2")
     
+    def test_count(self):
+        """Test SELECT COUNT(*) with and without WHERE"""
+        self.db.execute("CREATE TABLE nums (n INTEGER);")
+        for i in range(10):
+            self.db.execute(f"INSERT INTO nums VALUES ({i});")
+        self.db.execute("DELETE FROM nums WHERE n = 0;")
+        
+        self.assertEqual(self.db.execute("SELECT COUNT(*) FROM nums;"), [(9,)])
+        self.assertEqual(self.db.execute("SELECT count(*) FROM nums WHERE n > 6;"), [(3,)])
+        self.assertEqual(self.db.execute("SELECT COUNT(*) FROM nums WHERE n = ?;", (5,)), [(1,)])
+    
+    def test_delete_compacts_storage(self):
+        """Test that deleting most rows drops them from storage"""
+        self.db.execute("CREATE TABLE nums (n INTEGER);")
+        for i in range(10):
+            self.db.execute(f"INSERT INTO nums VALUES ({i});")
+        self.assertEqual(self.db.execute("DELETE FROM nums WHERE n < 7;"), 7)
+        
+        table = self.db.engine.storage.get_table("nums")
+        self.assertEqual(table.row_count(), 3)
+        self.db.execute("INSERT INTO nums VALUES (3);")
+        self.assertEqual([row['n'] for row in table.select_where('n', '=', 3)], [3])
+        self.assertEqual(self.db.execute("SELECT * FROM nums;"), [(7,), (8,), (9,), (3,)])
+    
     def test_python_api(self):
         """Test Python API methods"""
         # Create table using Python API
@@ -198,6 +263,30 @@ class TestMandukyaDB(unittest.TestCase):
         results = self.db.select("users", where={"column": "id", "value": 1})
         self.assertEqual(len(results), 1)
     
+    def test_prepared_statements(self):
+        """Test prepare/execute and executemany with ? parameters"""
+        self.db.execute("CREATE TABLE prep (id INTEGER, name TEXT);")
+
+        insert = self.db.prepare("INSERT INTO prep VALUES (?, ?);")
+        self.assertEqual(insert.execute((1, "Arjuna")), 1)
+        self.assertEqual(self.db.executemany("INSERT INTO prep VALUES (?, ?);",
+                                             [(2, "Bhima"), (3, "Nakula")]), 2)
+
+        select = self.db.prepare("SELECT name FROM prep WHERE id = ?;")
+        self.assertEqual(select.execute((2,)), [("Bhima",)])
+        self.assertEqual(select.execute((3,)), [("Nakula",)])
+
+        self.db.execute("INSERT INTO prep VALUES (9, '?');")
+        quoted = self.db.prepare("INSERT INTO prep VALUES (?, '?');")
+        self.assertEqual(quoted.param_count, 1)
+        quoted.execute((10,))
+        self.assertEqual(self.db.execute("SELECT id FROM prep WHERE name = '?';"), [(9,), (10,)])
+
+        with self.assertRaises(MandukyaError):
+            insert.execute((4,))
+        with self.assertRaises(MandukyaError):
+            self.db.execute("INSERT INTO prep VALUES (?, ?);")
+
     def test_caching(self):
         """Test query result caching"""
         # Setup
@@ -216,7 +305,41 @@ class TestMandukyaDB(unittest.TestCase):
         # Check cache stats
         stats = self.db.get_stats()
         self.assertIn('cache_stats', stats)
-    
+
+    def test_cache_shared_across_spellings(self):
+        """Test that equivalent queries share one cached result"""
+        self.db.execute("CREATE TABLE spell (id INTEGER, data TEXT);")
+        self.db.execute("INSERT INTO spell VALUES (1, 'a');")
+
+        self.db.execute("SELECT * FROM spell WHERE id = 1;")
+        hits = self.db.get_stats()['execution_stats']['cache_hits']
+        self.db.execute("select *  from spell where id = 1")
+        self.db.select("spell", where={"column": "id", "value": 1})
+        self.assertEqual(self.db.get_stats()['execution_stats']['cache_hits'], hits + 2)
+
+    def test_cache_invalidated_on_write(self):
+        """Test that writes evict cached results for the table"""
+        self.db.execute("CREATE TABLE inval (id INTEGER, data TEXT);")
+        self.db.execute("INSERT INTO inval VALUES (1, 'a');")
+        self.assertEqual(len(self.db.execute("SELECT * FROM inval;")), 1)
+
+        self.db.execute("INSERT INTO inval VALUES (2, 'b');")
+        self.assertEqual(len(self.db.execute("SELECT * FROM inval;")), 2)
+
+        self.db.execute("DELETE FROM inval WHERE id = 1;")
+        self.assertEqual(self.db.execute("SELECT * FROM inval;"), [(2, 'b')])
+
+    def test_cache_index_bounded(self):
+        """Test that the table-to-query index only tracks cached queries"""
+        db = MandukyaDB(":memory:", cache_size=10)
+        db.execute("CREATE TABLE many (id INTEGER);")
+        for i in range(200):
+            db.execute(f"SELECT * FROM many WHERE id = {i};")
+        cache = db.engine.cache
+        self.assertLessEqual(len(cache.table_to_queries["many"]), 10)
+        self.assertLessEqual(len(cache.query_cache._expiry), 2 * 10)
+        db.close()
+
     def test_error_handling(self):
         """Test error handling"""
         # Test invalid SQL
@@ -238,6 +361,20 @@ class TestMandukyaDB(unittest.TestCase):
             db.execute("INSERT INTO temp VALUES (1);")
             results = db.execute("SELECT * FROM temp;")
             self.assertEqual(results, [(1,)])
+
+class TestMandukyaDBDisk(unittest.TestCase):
+    """Test MandukyaDB behaviour that needs a database file"""
+    
+    def setUp(self):
+        """Set up test database"""
+        self.test_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.test_dir, "test.db")
+        self.db = MandukyaDB(self.db_path)
+    
+    def tearDown(self):
+        """Clean up test database"""
+        self.db.close()
+        shutil.rmtree(self.test_dir)
     
     def test_persistence(self):
         """Test data persistence across database reopens"""
@@ -253,33 +390,147 @@ class TestMandukyaDB(unittest.TestCase):
         self.assertEqual(results, [(1, "test")])
         db2.close()
 
+    def test_begin_defers_commits(self):
+        """Test that writes after begin() reach disk only on commit()"""
+        self.db.execute("CREATE TABLE batch (id INTEGER);")
+        self.db.commit()
+        size = os.path.getsize(self.db_path)
+
+        self.db.begin()
+        for i in range(300):
+            self.db.execute(f"INSERT INTO batch VALUES ({i});")
+        self.assertEqual(os.path.getsize(self.db_path), size)
+
+        self.db.commit()
+        self.assertGreater(os.path.getsize(self.db_path), size)
+
+    def test_batch_block(self):
+        """Test that a batch block commits once on exit"""
+        self.db.execute("CREATE TABLE batch (id INTEGER);")
+        self.db.commit()
+        size = os.path.getsize(self.db_path)
+
+        with self.db.batch():
+            for i in range(300):
+                self.db.execute(f"INSERT INTO batch VALUES ({i});")
+            self.assertEqual(os.path.getsize(self.db_path), size)
+        self.assertGreater(os.path.getsize(self.db_path), size)
+
+    def test_persistence_log_replay(self):
+        """Test that logged deletes and snapshots survive a reopen"""
+        db1 = MandukyaDB(self.db_path)
+        db1.engine.storage.CHECKPOINT_RECORDS = 5
+        db1.execute("CREATE TABLE logged (id INTEGER, name TEXT);")
+        for i in range(8):
+            db1.execute(f"INSERT INTO logged VALUES ({i}, 'row{i}');")
+        db1.commit()
+        db1.execute("DELETE FROM logged WHERE id < 3;")
+        db1.execute("INSERT INTO logged VALUES (8, 'row8');")
+        db1.close()
+
+        db2 = MandukyaDB(self.db_path)
+        results = db2.execute("SELECT id FROM logged;")
+        self.assertEqual(results, [(i,) for i in range(3, 9)])
+        self.assertEqual(db2.execute("SELECT name FROM logged WHERE id = 5;"), [("row5",)])
+        db2.close()
+
+    def test_torn_tail_truncated(self):
+        """Test that a torn write at the end of the log does not swallow later commits"""
+        # A record cut short in its payload, and one cut short in its header
+        for i, torn in enumerate([b'\x02\x50\x00\x00\x00abc', b'\x02\x50']):
+            path = os.path.join(self.test_dir, f"torn{i}.db")
+            db = MandukyaDB(path)
+            db.execute("CREATE TABLE torn (id INTEGER);")
+            db.execute("INSERT INTO torn VALUES (1);")
+            db.close()
+            with open(path, 'ab') as f:
+                f.write(torn)
+
+            db = MandukyaDB(path)
+            db.execute("INSERT INTO torn VALUES (2);")
+            db.close()
+
+            db = MandukyaDB(path)
+            self.assertEqual(db.execute("SELECT * FROM torn;"), [(1,), (2,)])
+            db.close()
+
+    def test_row_ids_not_reused(self):
+        """Test that row IDs keep growing across compaction and reopen"""
+        self.db.execute("CREATE TABLE ids (id INTEGER);")
+        for i in range(3):
+            self.db.execute(f"INSERT INTO ids VALUES ({i});")
+        self.db.execute("DELETE FROM ids WHERE id < 2;")
+        self.assertEqual(self.db.execute("INSERT INTO ids VALUES (3);"), 4)
+        self.db.close()
+        
+        db = MandukyaDB(self.db_path)
+        self.assertEqual(db.engine.storage.get_table("ids").row_ids, [3, 4])
+        self.assertEqual(db.execute("INSERT INTO ids VALUES (4);"), 5)
+        db.close()
+    
+    def test_legacy_pickle_file(self):
+        """Test that a whole-file pickle from the row-dict format is migrated"""
+        tree = BTree()
+        tree.insert(1, {'id': 1, 'name': 'Arjuna'})
+        tree.insert(2, {'id': 2, 'name': 'Karna', '__deleted__': True})
+        tree.insert(3, {'id': 3, 'name': 'Bhima'})
+        columns = [Column('id', 'INTEGER'), Column('name', 'TEXT')]
+        state = {'name': 'heroes', 'columns': columns, 'column_names': ['id', 'name'],
+                 'column_types': {'id': 'INTEGER', 'name': 'TEXT'},
+                 'data_tree': tree, 'next_row_id': 4, 'indexes': {}}
+        
+        class LegacyTable:
+            def __reduce__(self):
+                return (copyreg._reconstructor, (Table, object, None), state)
+        
+        legacy_path = os.path.join(self.test_dir, "legacy.db")
+        with open(legacy_path, 'wb') as f:
+            pickle.dump({'heroes': LegacyTable()}, f)
+        
+        for _ in range(2):  # migrated on first open, read back as a snapshot after
+            db = MandukyaDB(legacy_path)
+            self.assertEqual(db.execute("SELECT * FROM heroes;"), [(1, 'Arjuna'), (3, 'Bhima')])
+            self.assertEqual(db.engine.storage.get_table("heroes").row_ids, [1, 3])
+            db.close()
+    
+    def test_unknown_log_record(self):
+        """Test that a file with an unknown record type fails to open"""
+        bad_path = os.path.join(self.test_dir, "bad.db")
+        with open(bad_path, 'wb') as f:
+            f.write(b'\x09\x00\x00\x00\x05hello')
+        with self.assertRaises(StorageError):
+            MandukyaDB(bad_path)
+
 class TestPerformance(unittest.TestCase):
     """Performance tests for MandukyaDB"""
     
-    def setUp(self):
-        self.db = MandukyaDB(":memory:")
-        self.db.execute("CREATE TABLE perf_test (id INTEGER, value INTEGER);")
+    @classmethod
+    def setUpClass(cls):
+        # One database for the class; each test starts from an empty table
+        cls.db = MandukyaDB(":memory:")
+        cls.db.execute("CREATE TABLE perf_test (id INTEGER, value INTEGER);")
     
-    def tearDown(self):
-        self.db.close()
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+    
+    def setUp(self):
+        self.db.execute("DELETE FROM perf_test;")
     
     def test_bulk_insert(self):
         """Test performance with bulk inserts"""
         import time
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        # Insert 1000 rows
-        for i in range(1000):
-            self.db.execute(f"INSERT INTO perf_test VALUES ({i}, {i*2});")
+        # Insert 1000 rows, parsing the statement once
+        with self.db.batch():
+            self.db.executemany("INSERT INTO perf_test VALUES (?, ?);", _BULK_ROWS)
         
-        insert_time = time.time() - start_time
+        insert_time = time.perf_counter() - start_time
         
         # Verify all rows inserted
-        results = self.db.execute("SELECT COUNT(*) FROM perf_test;")
-        # Note: COUNT(*) not implemented, so check differently
-        results = self.db.execute("SELECT * FROM perf_test;")
-        self.assertEqual(len(results), 1000)
+        self.assertEqual(self.db.execute("SELECT COUNT(*) FROM perf_test;"), [(1000,)])
         
         print(f"\nBulk insert performance: {insert_time:.3f}s for 1000 rows")
     
@@ -289,19 +540,19 @@ class TestPerformance(unittest.TestCase):
         
         # Insert test data
         for i in range(100):
-            self.db.execute(f"INSERT INTO perf_test VALUES ({i}, {i});")
+            self.db.execute("INSERT INTO perf_test VALUES (?, ?);", (i, i))
         
         query = "SELECT * FROM perf_test WHERE value > 50;"
         
         # First query (cache miss)
-        start_time = time.time()
+        start_time = time.perf_counter()
         results1 = self.db.execute(query)
-        first_time = time.time() - start_time
+        first_time = time.perf_counter() - start_time
         
         # Second query (cache hit)
-        start_time = time.time()
+        start_time = time.perf_counter()
         results2 = self.db.execute(query)
-        second_time = time.time() - start_time
+        second_time = time.perf_counter() - start_time
         
         self.assertEqual(results1, results2)
         print(f"\nCache performance: {first_time:.4f}s → {second_time:.4f}s")
@@ -323,6 +574,7 @@ def run_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestSQLParser))
     suite.addTests(loader.loadTestsFromTestCase(TestBTree))
     suite.addTests(loader.loadTestsFromTestCase(TestMandukyaDB))
+    suite.addTests(loader.loadTestsFromTestCase(TestMandukyaDBDisk))
     suite.addTests(loader.loadTestsFromTestCase(TestPerformance))
     
     # Run tests
@@ -6,6 +6,7 @@ Simple MandukyaDB validation and benchmark
 import sys
 import os
 import time
+import timeit
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -36,8 +37,8 @@ def validate_basic_functionality():
             # Test SELECT
             results = db.execute("SELECT * FROM test;")
             print(f"✅ SELECT: Found {len(results)} rows")
-            for i, row in enumerate(results):
-                print(f"   Row {i+1}: {row}")
+            if results:
+                print("\n".join(f"   Row {i}: {row}" for i, row in enumerate(results, 1)))
             
             # Test DELETE
             deleted = db.execute("DELETE FROM test WHERE id = 1;")
@@ -69,29 +70,29 @@ def benchmark_performance():
         
         # Benchmark bulk inserts
         print("Testing bulk insert performance...")
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        for i in range(1000):
-            db.execute(f"INSERT INTO benchmark VALUES ({i}, {i*i});")
+        rows = [(i, i*i) for i in range(1000)]
+        with db.batch():
+            db.executemany("INSERT INTO benchmark VALUES (?, ?);", rows)
         
-        insert_time = time.time() - start_time
+        insert_time = time.perf_counter() - start_time
         print(f"✅ Inserted 1000 rows in {insert_time:.3f}s ({1000/insert_time:.0f} rows/sec)")
         
         # Benchmark query performance
         print("\nTesting query performance...")
         
         # First query (cache miss)
-        start_time = time.time()
+        start_time = time.perf_counter()
         results1 = db.execute("SELECT * FROM benchmark WHERE value > 500000;")
-        first_query_time = time.time() - start_time
+        first_query_time = time.perf_counter() - start_time
         
-        # Second query (cache hit)
-        start_time = time.time()
-        results2 = db.execute("SELECT * FROM benchmark WHERE value > 500000;")
-        second_query_time = time.time() - start_time
+        # Repeated query (cache hit): best of 5 runs of 100 calls
+        timer = timeit.Timer(lambda: db.execute("SELECT * FROM benchmark WHERE value > 500000;"))
+        second_query_time = min(timer.repeat(repeat=5, number=100)) / 100
         
         print(f"✅ First query: {first_query_time*1000:.2f}ms ({len(results1)} results)")
-        print(f"✅ Second query: {second_query_time*1000:.2f}ms (cached)")
+        print(f"✅ Second query: {second_query_time*1e6:.1f}µs (cached, best of 5)")
         
         if first_query_time > 0:
             speedup = first_query_time / second_query_time if second_query_time > 0 else float('inf')
@@ -126,26 +127,24 @@ def demonstrate_philosophy():
         print("Wisdom retrieved:")
         
         # Handle the parsing issue - results may have concatenated columns
+        lines = []
         for row in results:
             if len(row) == 2:
                 # Proper two-column result
                 concept, description = row
-                print(f"  {concept}: {description}")
+                lines.append(f"  {concept}: {description}")
             elif len(row) == 1:
                 # Concatenated result - try to split
                 combined = row[0]
-                # Simple split approach - find common patterns
-                if ' ' in combined:
-                    parts = combined.split(' ', 1)  # Split on first space
-                    if len(parts) == 2:
-                        concept, description = parts
-                        print(f"  {concept}: {description}")
-                    else:
-                        print(f"  {combined}")
+                concept, sep, description = combined.partition(' ')  # Split on first space
+                if sep:
+                    lines.append(f"  {concept}: {description}")
                 else:
-                    print(f"  {combined}")
+                    lines.append(f"  {combined}")
             else:
-                print(f"  {row}")
+                lines.append(f"  {row}")
+        # One write for all rows
+        print("\n".join(lines))
 
 if __name__ == "__main__":
     print("MandukyaDB - Lightweight Relational Database")